@@ -1,19 +1,23 @@
 import asyncio
 import json
+import hashlib
+import time
 import uuid
 from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from threading import Thread
+from threading import Lock, Thread
 import logging
 import os
 import json
 
 from replit_finder.main import find_production_repl_apps
 from replit_finder.github_search import search_github_repos
-from replit_finder.database import get_all_repositories, init_db, get_repositories_paginated, get_dashboard_stats
-from replit_finder.config import SERPAPI_API_KEY, GITHUB_TOKEN
+from replit_finder.database import get_all_repositories, init_db, get_repositories_paginated, get_repositories_after, count_repositories_cached, encode_cursor, get_dashboard_stats, get_pages_linking_to, get_repos_on_page, release_connection, pool_stats
+from replit_finder.config import SERPAPI_API_KEY, GITHUB_TOKENS, ENRICH_CONCURRENCY, DASHBOARD_CACHE_SECONDS
+from replit_finder.github_api import cache_stats, rate_limit_budget
+from replit_finder.frontier import get_run_summary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +46,11 @@ socketio = SocketIO(app, cors_allowed_origins=allowed_origins, async_mode='threa
 # Store active searches
 active_searches = {}
 
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Return the request thread's database connection to the shared pool"""
+    release_connection()
+
 class SearchProgress:
     def __init__(self, search_id):
         self.search_id = search_id
@@ -101,18 +110,56 @@ def get_config():
     """Get configuration status"""
     return jsonify({
         'serpapi_configured': bool(SERPAPI_API_KEY),
-        'github_configured': bool(GITHUB_TOKEN),
-        'database_initialized': True
+        'github_configured': bool(GITHUB_TOKENS),
+        'github_tokens': len(GITHUB_TOKENS),
+        'database_initialized': True,
+        'database_pool': pool_stats()
     })
 
+@app.route('/api/github/status', methods=['GET'])
+def github_status():
+    """Get the live GitHub rate-limit budget and response cache counters"""
+    try:
+        return jsonify({
+            'budget': rate_limit_budget(),
+            'cache': cache_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error fetching GitHub status: {str(e)}")
+        return jsonify({'error': 'Failed to fetch GitHub status'}), 500
+
+@app.route('/api/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    """Get a crawl run's frontier state counts and dead-letter items"""
+    try:
+        summary = get_run_summary(run_id)
+        if summary is None:
+            return jsonify({'error': 'Run not found'}), 404
+        return jsonify(summary)
+    except Exception as e:
+        logger.error(f"Error fetching run {run_id}: {str(e)}")
+        return jsonify({'error': 'Failed to fetch run'}), 500
+
 @app.route('/api/repositories', methods=['GET'])
 def get_repositories():
-    """Get paginated list of repositories"""
+    """Get paginated list of repositories, by page number or by keyset cursor"""
     try:
-        page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
         sort = request.args.get('sort', '-score')
         query = request.args.get('query', '')
+
+        if 'cursor' in request.args:
+            try:
+                repos, next_cursor = get_repositories_after(request.args.get('cursor') or None, per_page, sort, query)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            response = {'items': repos, 'next_cursor': next_cursor, 'per_page': per_page}
+            # Totals are a cached count and only computed on request
+            if request.args.get('include_total') in ('1', 'true'):
+                response['total'] = count_repositories_cached(query)
+            return jsonify(response)
+
+        page = int(request.args.get('page', 1))
         
         # Get repositories from database
         repos, total = get_repositories_paginated(page, per_page, sort, query)
@@ -122,18 +169,57 @@ def get_repositories():
             'total': total,
             'page': page,
             'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page
+            'pages': (total + per_page - 1) // per_page,
+            'next_cursor': encode_cursor(sort, repos[-1]) if len(repos) == per_page and page * per_page < total else None
         })
     except Exception as e:
         logger.error(f"Error fetching repositories: {str(e)}")
         return jsonify({'error': 'Failed to fetch repositories'}), 500
 
+@app.route('/api/links/pages', methods=['GET'])
+def pages_linking_to_repo():
+    """Get the candidate pages that link to a repository"""
+    repo_url = request.args.get('repo_url', '')
+    if not repo_url:
+        return jsonify({'error': 'repo_url is required'}), 400
+    try:
+        pages = get_pages_linking_to(repo_url)
+        return jsonify({'repo_url': repo_url, 'items': pages, 'total': len(pages)})
+    except Exception as e:
+        logger.error(f"Error fetching pages for {repo_url}: {str(e)}")
+        return jsonify({'error': 'Failed to fetch linking pages'}), 500
+
+@app.route('/api/links/repositories', methods=['GET'])
+def repos_found_on_page():
+    """Get the repositories found on a candidate page"""
+    page_url = request.args.get('page_url', '')
+    if not page_url:
+        return jsonify({'error': 'page_url is required'}), 400
+    try:
+        repos = get_repos_on_page(page_url)
+        return jsonify({'page_url': page_url, 'items': repos, 'total': len(repos)})
+    except Exception as e:
+        logger.error(f"Error fetching repositories for {page_url}: {str(e)}")
+        return jsonify({'error': 'Failed to fetch page repositories'}), 500
+
+# Last dashboard stats response: (monotonic time, JSON body, ETag)
+_dashboard_cache = None
+_dashboard_lock = Lock()
+
 @app.route('/api/dashboard-stats', methods=['GET'])
 def dashboard_stats():
-    """Get statistics for the dashboard"""
+    """Get statistics for the dashboard, reused for DASHBOARD_CACHE_SECONDS and revalidated by ETag"""
+    global _dashboard_cache
     try:
-        stats = get_dashboard_stats()
-        return jsonify(stats)
+        with _dashboard_lock:
+            if _dashboard_cache is None or time.monotonic() - _dashboard_cache[0] >= DASHBOARD_CACHE_SECONDS:
+                body = json.dumps(get_dashboard_stats())
+                _dashboard_cache = (time.monotonic(), body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+            _, body, etag = _dashboard_cache
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
         return jsonify({'error': 'Failed to fetch dashboard stats'}), 500
@@ -220,12 +306,20 @@ def run_search_async(search_id, search_type, query, filters):
             queries = [query] if query else []
             min_score = filters.get('minScore', 10)
             max_results = filters.get('maxResults', 30)
+            concurrency = int(filters.get('concurrency', ENRICH_CONCURRENCY))
+            # The search id doubles as the run id, so an interrupted search can be resumed
+            resume_run_id = filters.get('resumeRunId')
             
             # Run the search
             asyncio.run(find_production_repl_apps(
                 queries=queries,
                 min_score=min_score,
                 max_results=max_results,
+                concurrency=concurrency,
+                run_id=resume_run_id or search_id,
+                resume=bool(resume_run_id),
+                retry_failed=bool(filters.get('retryFailed', False)),
+                incremental=bool(filters.get('incremental', False)),
                 progress_callback=lambda step, count, total: progress.update(
                     current_step=step,
                     processed_count=count,
@@ -240,6 +334,7 @@ def run_search_async(search_id, search_type, query, filters):
             
             min_stars = filters.get('minStars', 100)
             min_score = filters.get('minScore', 10)
+            concurrency = int(filters.get('concurrency', ENRICH_CONCURRENCY))
             
             asyncio.run(search_github_repos(
                 query=query,
@@ -247,6 +342,7 @@ def run_search_async(search_id, search_type, query, filters):
                 min_score=min_score,
                 clone=False,
                 out_csv="",
+                concurrency=concurrency,
                 progress_callback=lambda step, count, total: progress.update(
                     current_step=step,
                     processed_count=count,
@@ -0,0 +1,13 @@
+import pytest
+
+from replit_finder import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, initialized results database for one test."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "repos.db"))
+    database.invalidate_count_cache()
+    database.init_db()
+    yield
+    database.close_connection()
@@ -4,9 +4,12 @@ import os
 import sys
 import asyncio
 
+from . import database, offload, writer
+from .frontier import get_run_summary
 from .main import find_production_repl_apps
+from .sinks import SINKS
 from .github_search import search_github_repos # New import
-from .config import DEFAULT_MAX_RESULTS, PRODUCTION_SCORE_THRESHOLD
+from .config import BUDGET_EXPLORATION, DEFAULT_MAX_RESULTS, ENRICH_CONCURRENCY, PRODUCTION_SCORE_THRESHOLD
 
 def load_dorks_from_file(path: str) -> list[str]:
     """
@@ -34,7 +37,16 @@ def main():
     parser_replit.add_argument("--max-results", help="Max results per query", type=int, default=DEFAULT_MAX_RESULTS)
     parser_replit.add_argument("--min-score", help="Minimum production score", type=int, default=PRODUCTION_SCORE_THRESHOLD)
     parser_replit.add_argument("--clone", help="Clone repositories that pass the threshold", action="store_true")
-    parser_replit.add_argument("--out", help="CSV output filename", default="production_replit_projects.csv")
+    parser_replit.add_argument("--out", help="Output filename (.csv, .jsonl or .parquet)", default="production_replit_projects.csv")
+    parser_replit.add_argument("--format", help="Output format; inferred from --out when omitted", choices=list(SINKS))
+    parser_replit.add_argument("--no-sort", help="Append rows as they are found instead of sorting by score", action="store_true")
+    parser_replit.add_argument("--concurrency", help="Repositories enriched in parallel", type=int, default=ENRICH_CONCURRENCY)
+    parser_replit.add_argument("--resume", help="Resume an interrupted run by its run id", metavar="RUN_ID")
+    parser_replit.add_argument("--refresh-search", help="Query the search engines even for results cached within SEARCH_CACHE_TTL", action="store_true")
+    parser_replit.add_argument("--incremental", help="Only search for results newer than each dork's last run and skip pages fetched before", action="store_true")
+    parser_replit.add_argument("--budget", help="Total results to request, split across dorks by their past yield (replaces --max-results)", type=int, metavar="RESULTS")
+    parser_replit.add_argument("--exploration", help="With --budget, share of the quota spread evenly over all dorks", type=float, default=BUDGET_EXPLORATION)
+    parser_replit.add_argument("--retry-failed", help="With --resume, also retry the run's dead-letter items", action="store_true")
 
     # Sub-parser for github-search
     parser_github = subparsers.add_parser("github-search", help="Search for production-grade GitHub repos.")
@@ -42,13 +54,26 @@ def main():
     parser_github.add_argument("--min-stars", help="Minimum stars for a repo to be considered", type=int, default=100)
     parser_github.add_argument("--min-score", help="Minimum production score", type=int, default=PRODUCTION_SCORE_THRESHOLD)
     parser_github.add_argument("--clone", help="Clone repositories that pass the threshold", action="store_true")
-    parser_github.add_argument("--out", help="CSV output filename", default="production_github_projects.csv")
+    parser_github.add_argument("--out", help="Output filename (.csv, .jsonl or .parquet)", default="production_github_projects.csv")
+    parser_github.add_argument("--format", help="Output format; inferred from --out when omitted", choices=list(SINKS))
+    parser_github.add_argument("--no-sort", help="Append rows as they are found instead of sorting by score", action="store_true")
+    parser_github.add_argument("--concurrency", help="Repositories enriched in parallel", type=int, default=ENRICH_CONCURRENCY)
 
+    # Sub-parser for rebuild-stats
+    subparsers.add_parser("rebuild-stats", help="Recompute the dashboard aggregates from the repositories table.")
 
     args = parser.parse_args()
 
     if args.command == "replit-find":
-        if args.query:
+        if args.retry_failed and not args.resume:
+            parser_replit.error("--retry-failed requires --resume RUN_ID")
+        if args.resume:
+            database.init_db()
+            if get_run_summary(args.resume) is None:
+                print(f"[!] Unknown run id: {args.resume}", file=sys.stderr)
+                sys.exit(1)
+            queries = None  # the stored run supplies its own queries
+        elif args.query:
             queries = [args.query]
         else:
             if not os.path.exists(args.dorks_file):
@@ -62,6 +87,16 @@ def main():
             clone=args.clone,
             min_score=args.min_score,
             out_csv=args.out,
+            concurrency=args.concurrency,
+            run_id=args.resume,
+            resume=bool(args.resume),
+            retry_failed=args.retry_failed,
+            out_format=args.format,
+            sort_output=not args.no_sort,
+            refresh_search=args.refresh_search,
+            incremental=args.incremental,
+            result_budget=args.budget,
+            exploration=args.exploration,
         ))
     elif args.command == "github-search":
         asyncio.run(search_github_repos(
@@ -70,7 +105,16 @@ def main():
             clone=args.clone,
             min_score=args.min_score,
             out_csv=args.out,
+            concurrency=args.concurrency,
+            out_format=args.format,
+            sort_output=not args.no_sort,
         ))
+    elif args.command == "rebuild-stats":
+        database.init_db()
+        total = database.rebuild_dashboard_counts()
+        print(f"[+] Rebuilt dashboard aggregates over {total} repositories")
+    writer.get_writer().close()
+    offload.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,13 @@
 # replit_finder/analysis.py
 import os
 import json
+import asyncio
 import subprocess
 
+from . import offload
+
+SOURCE_EXTENSIONS = (".py", ".js", ".ts", ".jsx", ".tsx", ".html", ".css")
+
 def run_trufflehog(path: str) -> int:
     """
     Runs trufflehog on a given directory to find secrets.
@@ -43,6 +48,51 @@ def run_bandit(path: str) -> int:
         print(f"[!] Bandit scan failed for {path}: {e}")
         return -1 # Indicate an error
 
+async def run_trufflehog_async(path: str) -> int:
+    """
+    Async variant of run_trufflehog: findings are counted as trufflehog streams
+    them, one JSON object per line, without buffering the whole output.
+    """
+    if not await offload.run_io(os.path.isdir, path):
+        return 0
+    findings = 0
+    errors: list[json.JSONDecodeError] = []
+
+    def count(line: str):
+        nonlocal findings
+        if not line.strip():
+            return
+        try:
+            json.loads(line)
+            findings += 1
+        except json.JSONDecodeError as e:
+            errors.append(e)
+
+    try:
+        returncode, _, _ = await offload.run_subprocess(["trufflehog", "filesystem", path, "--json"], on_line=count)
+    except FileNotFoundError as e:
+        print(f"[!] Trufflehog scan failed for {path}: {e}")
+        return -1
+    if returncode != 0 or errors:
+        print(f"[!] Trufflehog scan failed for {path}: {errors[0] if errors else f'exit status {returncode}'}")
+        return -1
+    return findings
+
+async def run_bandit_async(path: str) -> int:
+    """
+    Async variant of run_bandit.
+    """
+    if not await offload.run_io(os.path.isdir, path):
+        return 0
+    try:
+        # Bandit exits with 1 if issues are found
+        _, stdout, _ = await offload.run_subprocess(["bandit", "-r", path, "-f", "json"])
+        data = json.loads(stdout)
+        return len(data.get("results", []))
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"[!] Bandit scan failed for {path}: {e}")
+        return -1
+
 def score_repo(meta: dict) -> int:
     """
     Scores a repository based on a set of heuristics to determine if it is "production-grade".
@@ -90,19 +140,40 @@ def analyze_local_repo(path: str) -> dict[str, int]:
     """
     Analyzes a local repository to get file counts, line counts, and security findings.
     """
+    stats = count_source_files(path)
+    
+    # Add security scan results
+    stats["trufflehog_findings"] = run_trufflehog(path)
+    stats["bandit_findings"] = run_bandit(path)
+    
+    return stats
+
+def count_source_files(path: str) -> dict[str, int]:
+    """
+    Counts source files and their lines under `path`.
+    """
     stats = {"total_files": 0, "total_lines": 0}
     for root, _, files in os.walk(path):
         for f in files:
-            if f.endswith((".py", ".js", ".ts", ".jsx", ".tsx", ".html", ".css")):
+            if f.endswith(SOURCE_EXTENSIONS):
                 stats["total_files"] += 1
                 try:
                     with open(os.path.join(root, f), "r", encoding="utf-8", errors="ignore") as fh:
                         stats["total_lines"] += sum(1 for _ in fh)
                 except OSError:
                     pass
-    
-    # Add security scan results
-    stats["trufflehog_findings"] = run_trufflehog(path)
-    stats["bandit_findings"] = run_bandit(path)
-    
+    return stats
+
+async def analyze_local_repo_async(path: str) -> dict[str, int]:
+    """
+    Async variant of analyze_local_repo: the file walk runs on the I/O pool and
+    both scanners run as concurrent subprocesses, so the event loop stays free.
+    """
+    stats, trufflehog_findings, bandit_findings = await asyncio.gather(
+        offload.run_io(count_source_files, path),
+        run_trufflehog_async(path),
+        run_bandit_async(path),
+    )
+    stats["trufflehog_findings"] = trufflehog_findings
+    stats["bandit_findings"] = bandit_findings
     return stats
\ No newline at end of file
@@ -0,0 +1,49 @@
+# replit_finder/budget.py
+from dataclasses import asdict, dataclass
+
+from .config import BUDGET_EXPLORATION
+
+# Smoothing for dorks with little history: every dork starts as if PRIOR_SCORE
+# production repos had come out of PRIOR_CANDIDATES candidate pages
+PRIOR_SCORE = 1.0
+PRIOR_CANDIDATES = 20
+# Credit for a new repo that did not reach the production threshold
+NEW_REPO_WEIGHT = 0.1
+
+
+@dataclass
+class DorkYield:
+    """What one dork produced, in one run or accumulated over all runs."""
+    runs: int = 0
+    candidates: int = 0
+    pages_with_repos: int = 0
+    new_repos: int = 0
+    production_repos: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def rate(self) -> float:
+        """Smoothed production repos (plus a little credit for other new repos) per candidate page."""
+        score = self.production_repos + NEW_REPO_WEIGHT * (self.new_repos - self.production_repos)
+        return (score + PRIOR_SCORE) / (self.candidates + PRIOR_CANDIDATES)
+
+
+def allocate_budget(queries: list[str], yields: dict[str, DorkYield], total: int, exploration: float = BUDGET_EXPLORATION) -> dict[str, int]:
+    """
+    Splits a total result quota over `queries`. A share of `exploration` is
+    spread evenly so unproductive or new dorks are still sampled; the rest goes
+    to each dork in proportion to its observed yield rate. Shares are rounded
+    with the largest-remainder method, so the allocation sums to `total`.
+    """
+    if not queries or total <= 0:
+        return {query: 0 for query in queries}
+    exploration = min(1.0, max(0.0, exploration))
+    rates = {query: yields.get(query, DorkYield()).rate() for query in queries}
+    rate_sum = sum(rates.values())
+    shares = {query: total * (exploration / len(queries) + (1 - exploration) * rates[query] / rate_sum) for query in queries}
+    allocation = {query: int(share) for query, share in shares.items()}
+    leftover = total - sum(allocation.values())
+    for query in sorted(queries, key=lambda q: shares[q] - allocation[q], reverse=True)[:leftover]:
+        allocation[query] += 1
+    return allocation
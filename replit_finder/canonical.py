@@ -0,0 +1,64 @@
+# replit_finder/canonical.py
+from urllib.parse import urlsplit, urlunsplit
+
+REPO_HOSTS = {"github.com", "gitlab.com"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# First path segments of github.com that are site pages rather than owners
+GITHUB_RESERVED_OWNERS = {
+    "about", "apps", "codespaces", "collections", "contact", "customer-stories", "enterprise",
+    "events", "explore", "features", "issues", "login", "marketplace", "new", "notifications",
+    "orgs", "organizations", "pricing", "pulls", "readme", "search", "security", "settings",
+    "site", "sponsors", "topics", "trending", "users",
+}
+# Characters that end up glued to a link by the surrounding prose or markup
+TRAILING_PUNCTUATION = ".,;:!?)]}'\""
+
+
+def canonical_page_url(url: str) -> str:
+    """
+    Normalizes a candidate page URL: lowercase scheme and host, no default
+    port, no query or fragment, and no trailing slash except for the root.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, "", ""))
+
+
+def canonical_repo_url(url: str) -> str | None:
+    """
+    Collapses the variants of a GitHub/GitLab repository link to one key:
+    https://<host>/<owner>/<repo>, lowercased, without "www.", a ".git"
+    suffix, deeper paths or trailing punctuation. Returns None for URLs that
+    are not repository links (other hosts, profiles, github.com site pages).
+    GitHub and GitLab names are case-insensitive, so the key is lowercase.
+    It is the repo_url of every table; the alias table maps it to the key of
+    the repo's current `full_name` (after renames) once GitHub has been asked.
+    """
+    parts = urlsplit(url.strip() if "://" in url else "https://" + url.strip().lstrip("/"))
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host not in REPO_HOSTS:
+        return None
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if len(segments) < 2:
+        return None
+    owner = segments[0].lower()
+    repo = segments[1].rstrip(TRAILING_PUNCTUATION).lower()
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    if not owner or not repo or repo in (".", ".."):
+        return None
+    if host == "github.com" and owner in GITHUB_RESERVED_OWNERS:
+        return None
+    return f"https://{host}/{owner}/{repo}"
+
+
+def github_url(full_name: str) -> str:
+    """Builds the repository URL for a GitHub `full_name` ("Owner/Repo"), keeping GitHub's casing."""
+    return f"https://github.com/{full_name}"
@@ -2,6 +2,9 @@
 import os
 import subprocess
 
+from . import offload
+
+
 def git_clone(repo_url: str, target_dir: str, depth: int = 1) -> bool:
     """
     Clones a Git repository.
@@ -22,3 +25,30 @@ def git_clone(repo_url: str, target_dir: str, depth: int = 1) -> bool:
     except (subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"[!] git clone failed for {repo_url}: {e}")
         return False
+
+
+async def git_clone_async(repo_url: str, target_dir: str, depth: int = 1) -> bool:
+    """
+    Clones a Git repository with an asyncio subprocess, so the event loop keeps
+    serving other repositories while the clone runs.
+
+    Args:
+        repo_url: The URL of the repository to clone.
+        target_dir: The directory to clone the repository into.
+        depth: The depth of the clone.
+
+    Returns:
+        True if the clone was successful, False otherwise.
+    """
+    await offload.run_io(os.makedirs, target_dir, exist_ok=True)
+    command = ["git", "clone", "--depth", str(depth), repo_url, target_dir]
+    try:
+        returncode, _, stderr = await offload.run_subprocess(command)
+    except FileNotFoundError as e:
+        print(f"[!] git clone failed for {repo_url}: {e}")
+        return False
+    if returncode != 0:
+        detail = stderr.strip().splitlines()[-1] if stderr.strip() else ""
+        print(f"[!] git clone failed for {repo_url}: exit status {returncode} {detail}")
+        return False
+    return True
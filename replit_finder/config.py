@@ -4,6 +4,8 @@ import os
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 SCRAPERAPI_KEY = os.getenv("SCRAPERAPI_KEY")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# Optional pool of tokens (comma-separated); falls back to GITHUB_TOKEN
+GITHUB_TOKENS = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()] or ([GITHUB_TOKEN] if GITHUB_TOKEN else [])
 
 # General configuration
 OUTPUT_DIR = "data"
@@ -13,3 +15,74 @@ USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) ReplitProductionFinder/1.0"
 # Production score threshold for replit_production_finder.py
 PRODUCTION_SCORE_THRESHOLD = 10
 DEFAULT_MAX_RESULTS = 30
+
+
+# GitHub GraphQL batching (number of repositories per aliased query)
+GRAPHQL_BATCH_SIZE = int(os.getenv("GRAPHQL_BATCH_SIZE", "25"))
+
+# On-disk GitHub response cache size bound (megabytes)
+GITHUB_CACHE_MAX_MB = int(os.getenv("GITHUB_CACHE_MAX_MB", "256"))
+
+# Longest time a GitHub request waits for a rate-limit reset before giving up (seconds)
+GITHUB_MAX_PARK_SECONDS = int(os.getenv("GITHUB_MAX_PARK_SECONDS", "3900"))
+
+# Number of repositories enriched at the same time
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "8"))
+# Number of candidate pages fetched at the same time
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "16"))
+
+# Failures after which a frontier item moves to the dead-letter list
+FRONTIER_MAX_RETRIES = int(os.getenv("FRONTIER_MAX_RETRIES", "3"))
+
+# Threads for blocking I/O kept off the event loop (see offload.py); SQLite calls always use one thread
+IO_THREADS = int(os.getenv("IO_THREADS", "8"))
+
+# Result rows held in memory before a sorted output file spills a run to disk
+SORT_BUFFER_ROWS = int(os.getenv("SORT_BUFFER_ROWS", "10000"))
+
+# Bytes read from a candidate page before the rest is skipped
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Candidate page cache: seconds a stored page is reused without a request, and its size bound (0 disables it)
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", str(24 * 60 * 60)))
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "512"))
+
+# Candidate page politeness: requests in flight per host, seconds between request starts per host,
+# retries after a 429/503, and whether robots.txt is honoured
+HOST_CONCURRENCY = int(os.getenv("HOST_CONCURRENCY", "2"))
+HOST_MIN_DELAY = float(os.getenv("HOST_MIN_DELAY", "0.5"))
+HOST_MAX_RETRIES = int(os.getenv("HOST_MAX_RETRIES", "3"))
+RESPECT_ROBOTS = os.getenv("RESPECT_ROBOTS", "1").lower() not in ("0", "false", "no")
+
+# Search: queries in flight at once, results per SerpAPI page, and seconds between googlesearch calls
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+SERPAPI_PAGE_SIZE = int(os.getenv("SERPAPI_PAGE_SIZE", "100"))
+GOOGLE_SEARCH_PAUSE = float(os.getenv("GOOGLE_SEARCH_PAUSE", "2.0"))
+# Seconds a stored search result page is reused instead of querying the engine again (0 disables the cache)
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(24 * 60 * 60)))
+# Share of a --budget quota spread evenly over all dorks; the rest follows each dork's observed yield
+BUDGET_EXPLORATION = float(os.getenv("BUDGET_EXPLORATION", "0.2"))
+
+# Results database tuning: memory-mapped bytes, page cache size, and how long a writer waits for a lock
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Connections to the results database shared by all threads (API requests, crawler pools, writer)
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+# Write-behind repository writer: rows per transaction, and longest a queued row waits (milliseconds)
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "500"))
+WRITE_FLUSH_MS = int(os.getenv("WRITE_FLUSH_MS", "250"))
+
+# Re-enrichment of stored repositories: any repo older than REFRESH_MAX_AGE_DAYS, and repos scoring within
+# REFRESH_SCORE_MARGIN of --min-score once older than REFRESH_NEAR_THRESHOLD_DAYS (0 disables a rule)
+REFRESH_MAX_AGE_DAYS = float(os.getenv("REFRESH_MAX_AGE_DAYS", "0"))
+REFRESH_SCORE_MARGIN = int(os.getenv("REFRESH_SCORE_MARGIN", "0"))
+REFRESH_NEAR_THRESHOLD_DAYS = float(os.getenv("REFRESH_NEAR_THRESHOLD_DAYS", "7"))
+# Processed repositories above which the in-memory index is a Bloom filter, and its false-positive rate
+PROCESSED_BLOOM_MIN_ROWS = int(os.getenv("PROCESSED_BLOOM_MIN_ROWS", "1000000"))
+PROCESSED_BLOOM_FP_RATE = float(os.getenv("PROCESSED_BLOOM_FP_RATE", "0.001"))
+
+# Seconds a repository count (the API's list totals) is reused before it is recounted
+COUNT_CACHE_SECONDS = int(os.getenv("COUNT_CACHE_SECONDS", "30"))
+# Seconds /api/dashboard-stats serves the same aggregates before reading them again
+DASHBOARD_CACHE_SECONDS = int(os.getenv("DASHBOARD_CACHE_SECONDS", "5"))
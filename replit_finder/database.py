@@ -1,14 +1,177 @@
 # replit_finder/database.py
+import base64
+import json
 import os
 import sqlite3
+import threading
+import time
 from typing import Any, Dict, List
 from datetime import datetime, timedelta
 
+from . import canonical
+from .config import COUNT_CACHE_SECONDS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_MB, SQLITE_MMAP_MB, SQLITE_POOL_SIZE
+
 DB_PATH = os.getenv("DB_PATH", "replit_finder.db")
+# Prepared statements kept per connection; the crawler and the API reuse a small fixed set
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+# Repository counts per search query: query -> (monotonic time, count)
+_count_cache: Dict[str, tuple[float, int]] = {}
+_count_lock = threading.Lock()
+
+# Columns /api/repositories may sort by; each has an index on (field, repo_url)
+SORT_FIELDS = (
+    'stars', 'forks', 'commits', 'contributors', 'score',
+    'readme_len', 'total_files', 'total_lines',
+    'trufflehog_findings', 'bandit_findings', 'last_processed'
+)
+# Columns indexed by the repositories_fts full-text table
+FTS_COLUMNS = ('owner', 'repo', 'language', 'license', 'description')
+
+# Dashboard aggregates kept in dashboard_counts by triggers on repositories:
+# metric -> (key expression, condition); {r} is the new or old row
+DASHBOARD_METRICS = {
+    'total': ("''", "1"),
+    'production': ("''", "{r}.category = 'production'"),
+    'security': ("''", "{r}.trufflehog_findings > 0 OR {r}.bandit_findings > 0"),
+    'language': ("{r}.language", "{r}.language IS NOT NULL"),
+    # last_processed is ISO text, so its first 10 characters are the day
+    'day': ("substr({r}.last_processed, 1, 10)", "{r}.last_processed IS NOT NULL"),
+}
+
+# Per-dork counters accumulated across runs (see budget.py)
+DORK_YIELD_COLUMNS = ("runs", "candidates", "pages_with_repos", "new_repos", "production_repos")
+
+def configure_connection(conn: sqlite3.Connection):
+    """
+    Tunes a connection to the results database: WAL so API readers never block
+    the crawler's writer, synchronous=NORMAL (durable at checkpoints, no fsync
+    per commit), a memory map, a larger page cache and a busy timeout.
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+class ConnectionPool:
+    """
+    Bounded pool of tuned connections to the results database, shared by all
+    threads. Connections are opened (and configured) on demand up to `size`
+    and then reused; when all are checked out, callers wait for one to come back.
+    """
+
+    def __init__(self, size: int = SQLITE_POOL_SIZE):
+        self.size = max(1, size)
+        self.opened = 0
+        self.reused = 0
+        self._idle: List[tuple[sqlite3.Connection, str]] = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, path: str) -> sqlite3.Connection:
+        with self._cond:
+            while True:
+                while self._idle:
+                    conn, conn_path = self._idle.pop()
+                    if conn_path == path:
+                        self.reused += 1
+                        return conn
+                    # Opened for a previous DB_PATH
+                    conn.close()
+                    self._open -= 1
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                self._cond.wait()
+        try:
+            conn = sqlite3.connect(path, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+            configure_connection(conn)
+        except BaseException:
+            self.discard(None)
+            raise
+        with self._cond:
+            self.opened += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection, path: str):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._idle.append((conn, path))
+            self._cond.notify()
+
+    def discard(self, conn: sqlite3.Connection | None):
+        """Closes a checked-out connection instead of returning it."""
+        if conn is not None:
+            conn.close()
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+
+class _Lease:
+    """A pooled connection checked out by one thread; returned on release or when the thread exits."""
+
+    def __init__(self, pool: ConnectionPool, path: str):
+        self.pool = pool
+        self.path = path
+        self.conn = pool.acquire(path)
+
+    def release(self):
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            self.pool.release(conn, self.path)
+
+    def __del__(self):
+        # threading.local drops the lease when its thread ends
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
+_pool = ConnectionPool()
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns the connection the calling thread has checked out of the shared
+    pool, checking one out on first use. Use it as `with get_connection() as
+    conn:` to commit (or roll back) on exit. It stays with the thread until
+    release_connection() (the API calls it after every request) or thread exit.
+    """
+    lease = getattr(_local, "lease", None)
+    if lease is not None and (lease.conn is None or lease.path != DB_PATH):
+        lease.release()
+        lease = None
+    if lease is None:
+        lease = _local.lease = _Lease(_pool, DB_PATH)
+    return lease.conn
+
+def release_connection():
+    """Returns the calling thread's connection to the pool, if it has one."""
+    lease = getattr(_local, "lease", None)
+    if lease is not None:
+        lease.release()
+        _local.lease = None
+
+def close_connection():
+    """Closes the calling thread's connection instead of returning it to the pool."""
+    lease = getattr(_local, "lease", None)
+    if lease is not None and lease.conn is not None:
+        conn, lease.conn = lease.conn, None
+        _pool.discard(conn)
+    _local.lease = None
+
+def pool_stats() -> dict:
+    """Connections the shared pool has opened, and checkouts that reused one."""
+    return {"size": _pool.size, "opened": _pool.opened, "reused": _pool.reused}
 
 def init_db():
     """Initializes the database and creates the tables."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS repositories (
@@ -42,155 +205,676 @@ def init_db():
         columns = [column[1] for column in cursor.fetchall()]
         if 'language' not in columns:
             cursor.execute("ALTER TABLE repositories ADD COLUMN language TEXT")
+        if 'description' not in columns:
+            cursor.execute("ALTER TABLE repositories ADD COLUMN description TEXT")
 
+        # Sort indexes end in repo_url, the tie-breaker of every ordering, so a page is an index range scan
+        for field in SORT_FIELDS:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_repositories_{field} ON repositories ({field}, repo_url)")
+        _create_fts(cursor)
+        _create_dashboard_counts(cursor)
+
+        # Page <-> repo link graph. The original pages table held a single repo per
+        # page; move any rows it has into page_links and keep pages as a page registry.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS page_links (
+                page_url TEXT,
+                repo_url TEXT,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (page_url, repo_url)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_page_links_repo ON page_links (repo_url, page_url)")
+        cursor.execute("PRAGMA table_info(pages)")
+        page_columns = [column[1] for column in cursor.fetchall()]
+        if 'repo_url' in page_columns:
+            cursor.execute("INSERT OR IGNORE INTO page_links (page_url, repo_url) SELECT page_url, repo_url FROM pages WHERE repo_url IS NOT NULL")
+            cursor.execute("DROP TABLE pages")
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS pages (
                 page_url TEXT PRIMARY KEY,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Crawl frontier: per-run work items and their state, for checkpoint/resume
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                kind TEXT,
+                params TEXT,
+                status TEXT,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                run_id TEXT,
+                kind TEXT,
+                item TEXT,
+                state TEXT DEFAULT 'pending',
+                retries INTEGER DEFAULT 0,
+                last_error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (run_id, kind, item),
+                FOREIGN KEY (run_id) REFERENCES runs (run_id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier (run_id, kind, state)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS frontier_links (
+                run_id TEXT,
+                page_url TEXT,
                 repo_url TEXT,
-                FOREIGN KEY (repo_url) REFERENCES repositories (repo_url)
+                PRIMARY KEY (run_id, page_url, repo_url)
+            )
+        """)
+        # Which of the run's queries found each candidate page, to credit dork yields after a resume
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS frontier_sources (
+                run_id TEXT,
+                page_url TEXT,
+                query TEXT,
+                PRIMARY KEY (run_id, page_url, query)
+            )
+        """)
+        # Canonical repo keys (see canonical.py) mapped to the key of GitHub's full_name and the repo id
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS repo_aliases (
+                alias TEXT PRIMARY KEY,
+                canonical_url TEXT NOT NULL,
+                repo_id INTEGER,
+                resolved_at TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_repo_aliases_repo_id ON repo_aliases (repo_id)")
+        _migrate(cursor)
+
+        # Incremental runs: when each dork last searched successfully, and every candidate page ever fetched
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dorks (
+                query TEXT PRIMARY KEY,
+                last_success_at TIMESTAMP,
+                runs INTEGER DEFAULT 0,
+                candidates INTEGER DEFAULT 0,
+                pages_with_repos INTEGER DEFAULT 0,
+                new_repos INTEGER DEFAULT 0,
+                production_repos INTEGER DEFAULT 0
+            )
+        """)
+        # Yield columns were added after the table; add them to older databases
+        cursor.execute("PRAGMA table_info(dorks)")
+        dork_columns = [column[1] for column in cursor.fetchall()]
+        for column in DORK_YIELD_COLUMNS:
+            if column not in dork_columns:
+                cursor.execute(f"ALTER TABLE dorks ADD COLUMN {column} INTEGER DEFAULT 0")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS seen_pages (
+                page_url TEXT PRIMARY KEY,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_fetched TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
         conn.commit()
 
+def _create_fts(cursor: sqlite3.Cursor):
+    """
+    Creates the external-content FTS5 index over FTS_COLUMNS and the triggers
+    keeping it in sync with repositories; a new index is filled from the table.
+    Skipped when SQLite was built without FTS5 (searches then fall back to LIKE).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'repositories_fts'")
+    if cursor.fetchone():
+        # Indexes created before the vocabulary table existed
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS repositories_fts_vocab USING fts5vocab(repositories_fts, 'row')")
+        return
+    columns = ", ".join(FTS_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in FTS_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in FTS_COLUMNS)
+    try:
+        cursor.execute(f"CREATE VIRTUAL TABLE repositories_fts USING fts5({columns}, content='repositories', content_rowid='rowid')")
+    except sqlite3.OperationalError as e:
+        print(f"[!] Full-text search unavailable: {e}")
+        return
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS repositories_fts_insert AFTER INSERT ON repositories BEGIN
+            INSERT INTO repositories_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS repositories_fts_delete AFTER DELETE ON repositories BEGIN
+            INSERT INTO repositories_fts (repositories_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS repositories_fts_update AFTER UPDATE ON repositories BEGIN
+            INSERT INTO repositories_fts (repositories_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO repositories_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS repositories_fts_vocab USING fts5vocab(repositories_fts, 'row')")
+    cursor.execute("INSERT INTO repositories_fts (repositories_fts) VALUES ('rebuild')")
+
+def _lowercase_repo_keys(cursor: sqlite3.Cursor):
+    """
+    Repos are keyed by their lowercase canonical URL in every table; rewrites
+    rows stored under GitHub's casing. Where the key already has a row, the
+    cased duplicate is dropped.
+    """
+    for table, column in (("repositories", "repo_url"), ("page_links", "repo_url"), ("repo_aliases", "canonical_url")):
+        cursor.execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} != lower({column})")
+        renames = [(key, url) for (url,) in cursor.fetchall() if (key := canonical.canonical_repo_url(url)) and key != url]
+        if renames:
+            cursor.executemany(f"UPDATE OR IGNORE {table} SET {column} = ? WHERE {column} = ?", renames)
+            cursor.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(url,) for _, url in renames])
+
+# One-off data migrations, in order; PRAGMA user_version counts those already applied
+MIGRATIONS = (_lowercase_repo_keys,)
+
+def _migrate(cursor: sqlite3.Cursor):
+    """Applies the MIGRATIONS this database has not had yet, each exactly once."""
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {number}")
+
+def _count_statement(metric: str, row: str, delta: int) -> str:
+    key, condition = (part.format(r=row) for part in DASHBOARD_METRICS[metric])
+    return (
+        f"INSERT INTO dashboard_counts (metric, key, count) SELECT '{metric}', {key}, {delta} WHERE {condition} "
+        f"ON CONFLICT (metric, key) DO UPDATE SET count = count + excluded.count;"
+    )
+
+def _create_dashboard_counts(cursor: sqlite3.Cursor):
+    """
+    Creates dashboard_counts, one row per (metric, key) of DASHBOARD_METRICS,
+    and the triggers adjusting it on every repositories insert, update and
+    delete; a new table is filled from repositories.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'dashboard_counts'")
+    if cursor.fetchone():
+        return
+    cursor.execute("""
+        CREATE TABLE dashboard_counts (
+            metric TEXT,
+            key TEXT,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, key)
+        ) WITHOUT ROWID
+    """)
+    added = "\n".join(_count_statement(metric, "new", 1) for metric in DASHBOARD_METRICS)
+    removed = "\n".join(_count_statement(metric, "old", -1) for metric in DASHBOARD_METRICS)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS dashboard_counts_insert AFTER INSERT ON repositories BEGIN\n{added}\nEND")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS dashboard_counts_delete AFTER DELETE ON repositories BEGIN\n{removed}\nEND")
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS dashboard_counts_update AFTER UPDATE OF "
+        f"category, trufflehog_findings, bandit_findings, language, last_processed ON repositories BEGIN\n{removed}\n{added}\nEND"
+    )
+    _fill_dashboard_counts(cursor)
+
+def _fill_dashboard_counts(cursor: sqlite3.Cursor):
+    cursor.execute("DELETE FROM dashboard_counts")
+    for metric, (key, condition) in DASHBOARD_METRICS.items():
+        key, condition = key.format(r="repositories"), condition.format(r="repositories")
+        cursor.execute(
+            f"INSERT INTO dashboard_counts (metric, key, count) "
+            f"SELECT '{metric}', {key}, COUNT(*) FROM repositories WHERE {condition} GROUP BY {key}"
+        )
+
+def rebuild_dashboard_counts() -> int:
+    """
+    Recomputes dashboard_counts from repositories and returns the repository
+    total. Only needed when the two diverged: the aggregates were edited by
+    hand, or the triggers were dropped or the database restored from a copy
+    made while they did not exist.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        _create_dashboard_counts(cursor)
+        _fill_dashboard_counts(cursor)
+        cursor.execute("SELECT count FROM dashboard_counts WHERE metric = 'total'")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+def _fts_words(query: str) -> List[str] | None:
+    """
+    Splits a search box string the way the FTS tokenizer (unicode61) splits
+    text: lowercased runs of letters and digits. Returns None when a word has
+    any other character (URLs, "owner/repo", "c++"), which only LIKE can match.
+    """
+    words = query.lower().split()
+    if all(word.isalnum() for word in words):
+        return words
+    return None
+
+def _fts_query(words: List[str]) -> str:
+    """Every word must prefix-match a token."""
+    return " ".join(f'"{word}"*' for word in words)
+
+def _inside_tokens(cursor: sqlite3.Cursor, words: List[str]) -> bool:
+    """
+    Whether a word occurs inside some indexed token other than at its start
+    ("act" in "react"), which a prefix match would miss. Only the index
+    vocabulary is scanned, not the table.
+    """
+    for word in words:
+        cursor.execute(
+            "SELECT 1 FROM repositories_fts_vocab WHERE term GLOB ? AND term NOT GLOB ? LIMIT 1",
+            (f"*{word}*", f"{word}*"),
+        )
+        if cursor.fetchone():
+            return True
+    return False
+
+def _has_fts(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'repositories_fts_vocab'")
+    return cursor.fetchone() is not None
+
 def is_repo_processed(repo_url: str) -> bool:
     """Checks if a repository has already been processed."""
-    with sqlite3.connect(DB_PATH) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT 1 FROM repositories WHERE repo_url = ?", (repo_url,))
         return cursor.fetchone() is not None
 
+def count_repositories() -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM repositories").fetchone()[0]
+
+def iter_processed_repositories(batch_size: int = 10000):
+    """Yields (repo_url, last_processed, score) of every stored repository, fetched in batches."""
+    with get_connection() as conn:
+        cursor = conn.execute("SELECT repo_url, last_processed, score FROM repositories")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+REPOSITORY_COLUMNS = (
+    'repo_url', 'owner', 'repo', 'stars', 'forks', 'commits',
+    'contributors', 'has_ci', 'has_dockerfile', 'has_procfile',
+    'has_package_json', 'has_requirements', 'readme_len', 'license',
+    'score', 'category', 'total_files', 'total_lines',
+    'trufflehog_findings', 'bandit_findings', 'pages_linking',
+    'last_processed', 'language', 'description'
+)
+
 def insert_repository(repo_data: Dict[str, Any]):
     """Inserts a repository's data into the database."""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        
-        # Ensure all columns are present in repo_data, with defaults if missing
-        all_columns = [
-            'repo_url', 'owner', 'repo', 'stars', 'forks', 'commits', 
-            'contributors', 'has_ci', 'has_dockerfile', 'has_procfile', 
-            'has_package_json', 'has_requirements', 'readme_len', 'license', 
-            'score', 'category', 'total_files', 'total_lines', 
-            'trufflehog_findings', 'bandit_findings', 'pages_linking', 
-            'last_processed', 'language'
-        ]
-        
+    insert_repositories([repo_data])
+
+def insert_repositories(rows: List[Dict[str, Any]]):
+    """
+    Upserts many repositories in one transaction. Rows are grouped by the
+    columns they set, and each group is written with a single executemany.
+    """
+    groups: Dict[tuple, List[tuple]] = {}
+    for repo_data in rows:
         # Set default for last_processed if not provided
         if 'last_processed' not in repo_data:
             repo_data['last_processed'] = datetime.now()
-
         # Filter out any keys in repo_data that are not in the table columns
-        filtered_repo_data = {key: repo_data.get(key) for key in all_columns if key in repo_data}
+        columns = tuple(key for key in REPOSITORY_COLUMNS if key in repo_data)
+        groups.setdefault(columns, []).append(tuple(repo_data[key] for key in columns))
+    with get_connection() as conn:
+        for columns, values in groups.items():
+            placeholders = ", ".join(["?"] * len(columns))
+            # An upsert keeps the row (and its rowid) in place, so the update triggers see old and new values;
+            # INSERT OR REPLACE would delete the row without firing the delete triggers
+            updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != 'repo_url')
+            conn.executemany(
+                f"""
+                INSERT INTO repositories ({', '.join(columns)}) VALUES ({placeholders})
+                ON CONFLICT (repo_url) DO UPDATE SET {updates}
+                """,
+                values,
+            )
+
+def insert_page_links(links: List[tuple[str, str]]):
+    """Bulk-upserts (page_url, repo_url) links and the pages they come from."""
+    if not links:
+        return
+    now = datetime.now()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT INTO pages (page_url, first_seen, last_seen) VALUES (?, ?, ?)
+            ON CONFLICT (page_url) DO UPDATE SET last_seen = excluded.last_seen
+            """,
+            [(page_url, now, now) for page_url in {page_url for page_url, _ in links}],
+        )
+        cursor.executemany(
+            """
+            INSERT INTO page_links (page_url, repo_url, first_seen, last_seen) VALUES (?, ?, ?, ?)
+            ON CONFLICT (page_url, repo_url) DO UPDATE SET last_seen = excluded.last_seen
+            """,
+            [(page_url, repo_url, now, now) for page_url, repo_url in links],
+        )
+        conn.commit()
+
+def resolve_repo_aliases(aliases) -> Dict[str, str]:
+    """Returns {alias: canonical_url} for the aliases that were resolved by an earlier lookup."""
+    aliases = list(aliases)
+    resolved = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for i in range(0, len(aliases), 500):
+            chunk = aliases[i:i + 500]
+            cursor.execute(
+                f"SELECT alias, canonical_url FROM repo_aliases WHERE alias IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            resolved.update(cursor.fetchall())
+    return resolved
+
+def insert_repo_aliases(aliases: List[tuple[str, str, int | None]]):
+    """
+    Records (alias, canonical_url, repo_id) rows. Aliases already pointing at
+    the same repo id follow it to its new canonical URL, so a repo renamed
+    again after its first lookup keeps all of its old names.
+    """
+    if not aliases:
+        return
+    now = datetime.now()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO repo_aliases (alias, canonical_url, repo_id, resolved_at) VALUES (?, ?, ?, ?)",
+            [(alias, canonical_url, repo_id, now) for alias, canonical_url, repo_id in aliases],
+        )
+        cursor.executemany(
+            "UPDATE repo_aliases SET canonical_url = ? WHERE repo_id = ? AND canonical_url != ?",
+            list({(canonical_url, repo_id, canonical_url) for _, canonical_url, repo_id in aliases if repo_id is not None}),
+        )
+        conn.commit()
+
+def get_dork_last_runs(queries: List[str]) -> Dict[str, datetime]:
+    """Returns {query: last successful search time} for the queries searched before."""
+    runs = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for i in range(0, len(queries), 500):
+            chunk = queries[i:i + 500]
+            cursor.execute(
+                f"SELECT query, last_success_at FROM dorks WHERE query IN ({', '.join('?' * len(chunk))}) AND last_success_at IS NOT NULL",
+                chunk,
+            )
+            runs.update((query, datetime.fromisoformat(at)) for query, at in cursor.fetchall())
+    return runs
+
+def mark_dork_runs(runs: Dict[str, datetime]):
+    """Records {query: time of its successful search} for dorks whose run completed."""
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO dorks (query, last_success_at) VALUES (?, ?)
+            ON CONFLICT (query) DO UPDATE SET last_success_at = excluded.last_success_at
+            """,
+            list(runs.items()),
+        )
+        conn.commit()
+
+def get_dork_yields(queries: List[str] | None = None) -> Dict[str, Dict[str, int]]:
+    """Returns the accumulated yield counters of the given dorks (all dorks when omitted)."""
+    columns = ", ".join(DORK_YIELD_COLUMNS)
+    yields = {}
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if queries is None:
+            cursor.execute(f"SELECT query, {columns} FROM dorks")
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            for i in range(0, len(queries), 500):
+                chunk = queries[i:i + 500]
+                cursor.execute(f"SELECT query, {columns} FROM dorks WHERE query IN ({', '.join('?' * len(chunk))})", chunk)
+                rows.extend(cursor.fetchall())
+    for query, *counts in rows:
+        yields[query] = {column: count or 0 for column, count in zip(DORK_YIELD_COLUMNS, counts)}
+    return yields
 
-        placeholders = ", ".join(["?"] * len(filtered_repo_data))
-        columns = ", ".join(filtered_repo_data.keys())
-        
-        sql = f"INSERT OR REPLACE INTO repositories ({columns}) VALUES ({placeholders})"
-        cursor.execute(sql, tuple(filtered_repo_data.values()))
+def record_dork_yields(yields: Dict[str, Dict[str, int]]):
+    """Adds one run's per-dork counters to the stored totals."""
+    if not yields:
+        return
+    columns = ", ".join(DORK_YIELD_COLUMNS)
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in DORK_YIELD_COLUMNS)
+    with get_connection() as conn:
+        conn.executemany(
+            f"""
+            INSERT INTO dorks (query, {columns}) VALUES (?, {", ".join("?" * len(DORK_YIELD_COLUMNS))})
+            ON CONFLICT (query) DO UPDATE SET {updates}
+            """,
+            [(query, *(counts.get(column, 0) for column in DORK_YIELD_COLUMNS)) for query, counts in yields.items()],
+        )
         conn.commit()
 
+def unseen_pages(page_urls: List[str]) -> List[str]:
+    """Returns the page URLs (in order) that no earlier run has fetched."""
+    seen = set()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for i in range(0, len(page_urls), 500):
+            chunk = page_urls[i:i + 500]
+            cursor.execute(f"SELECT page_url FROM seen_pages WHERE page_url IN ({', '.join('?' * len(chunk))})", chunk)
+            seen.update(row[0] for row in cursor.fetchall())
+    return [url for url in page_urls if url not in seen]
+
+def mark_pages_seen(page_urls: List[str]):
+    """Adds fetched candidate pages to the seen-URL index."""
+    if not page_urls:
+        return
+    now = datetime.now()
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO seen_pages (page_url, first_seen, last_fetched) VALUES (?, ?, ?)
+            ON CONFLICT (page_url) DO UPDATE SET last_fetched = excluded.last_fetched
+            """,
+            [(url, now, now) for url in page_urls],
+        )
+        conn.commit()
+
+def get_pages_linking_to(repo_url: str) -> List[Dict[str, Any]]:
+    """Returns the pages that link to a repository, most recently seen first."""
+    repo_url = canonical.canonical_repo_url(repo_url) or repo_url
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(
+            "SELECT page_url, first_seen, last_seen FROM page_links WHERE repo_url = ? ORDER BY last_seen DESC",
+            (repo_url,),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_repos_on_page(page_url: str) -> List[Dict[str, Any]]:
+    """Returns the repositories found on a page, with their stored analysis when available."""
+    # Pages are stored under their canonical URL, so "HTTPS://App.repl.co?x=1" finds https://app.repl.co/
+    page_url = canonical.canonical_page_url(page_url)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(
+            """
+            SELECT l.repo_url, l.first_seen, l.last_seen, r.owner, r.repo, r.stars, r.score, r.category, r.language
+            FROM page_links l LEFT JOIN repositories r ON r.repo_url = l.repo_url
+            WHERE l.page_url = ?
+            ORDER BY r.score DESC
+            """,
+            (page_url,),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
 def get_all_repositories() -> List[Dict[str, Any]]:
     """Retrieves all repositories from the database."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
+    with get_connection() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         cursor.execute("SELECT * FROM repositories ORDER BY score DESC")
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
-def get_repositories_paginated(page: int = 1, per_page: int = 20, sort: str = '-score', query: str = '') -> tuple[List[Dict[str, Any]], int]:
-    """Retrieves paginated repositories from the database with optional search and sorting."""
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Build WHERE clause for search
-        where_clause = ""
-        params = []
-        if query:
-            where_clause = "WHERE (repo LIKE ? OR owner LIKE ? OR license LIKE ? OR language LIKE ?)"
-            search_term = f"%{query}%"
-            params = [search_term, search_term, search_term, search_term]
-        
-        # Build ORDER BY clause
-        order_by = "ORDER BY score DESC"  # default
-        allowed_sort_fields = {
-            'stars', 'forks', 'commits', 'contributors', 'score',
-            'readme_len', 'total_files', 'total_lines',
-            'trufflehog_findings', 'bandit_findings', 'last_processed'
-        }
+def _search_filter(cursor: sqlite3.Cursor, query: str) -> tuple[str, list]:
+    """
+    Returns the WHERE condition (without WHERE) and parameters for a search box
+    query. Plain words go through the FTS index; punctuated queries and words
+    found inside longer tokens keep the substring (LIKE) semantics.
+    """
+    query = query.strip()
+    if not query:
+        return "", []
+    words = _fts_words(query)
+    if words and _has_fts(cursor) and not _inside_tokens(cursor, words):
+        return "rowid IN (SELECT rowid FROM repositories_fts WHERE repositories_fts MATCH ?)", [_fts_query(words)]
+    search_term = f"%{query}%"
+    return "(repo LIKE ? OR owner LIKE ? OR license LIKE ? OR language LIKE ? OR repo_url LIKE ?)", [search_term] * 5
+
+def _sort_order(sort: str) -> tuple[str, bool]:
+    """Resolves a '-field' / 'field' sort parameter to (field, descending); unknown fields sort by -score."""
+    field = sort[1:] if sort.startswith('-') else sort
+    if field in SORT_FIELDS:
+        return field, sort.startswith('-')
+    return 'score', True
+
+def encode_cursor(sort: str, row: Dict[str, Any]) -> str:
+    """Builds the opaque cursor pointing just past `row` in `sort` order."""
+    field, descending = _sort_order(sort)
+    payload = json.dumps([field, descending, row.get(field), row['repo_url']], default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(sort: str, token: str) -> tuple[Any, str]:
+    """Returns the (sort value, repo_url) a cursor points past; raises ValueError for cursors of another sort."""
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        field, descending, value, repo_url = json.loads(payload)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if (field, descending) != _sort_order(sort):
+        raise ValueError("Cursor was issued for a different sort order")
+    return value, repo_url
 
-        if sort.startswith('-'):
-            field = sort[1:]
-            if field in allowed_sort_fields:
-                order_by = f"ORDER BY {field} DESC"
-        elif sort:
-            field = sort
-            if field in allowed_sort_fields:
-                order_by = f"ORDER BY {field} ASC"
-        
-        # Get total count
-        count_sql = f"SELECT COUNT(*) FROM repositories {where_clause}"
-        cursor.execute(count_sql, params)
+def _seek_condition(field: str, descending: bool, value: Any) -> str:
+    """
+    Condition for rows after (value, repo_url) in the sort order. SQLite puts
+    NULLs first ascending and last descending, which row values cannot express.
+    """
+    if descending:
+        if value is None:
+            return f"({field} IS NULL AND repo_url < ?)"
+        return f"(({field}, repo_url) < (?, ?) OR {field} IS NULL)"
+    if value is None:
+        return f"(({field} IS NULL AND repo_url > ?) OR {field} IS NOT NULL)"
+    return f"(({field}, repo_url) > (?, ?))"
+
+def count_repositories_cached(query: str = '', max_age: float = COUNT_CACHE_SECONDS) -> int:
+    """Number of repositories matching `query`, recounted at most every `max_age` seconds per query."""
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(query)
+    if cached and now - cached[0] < max_age:
+        return cached[1]
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        where, params = _search_filter(cursor, query)
+        cursor.execute(f"SELECT COUNT(*) FROM repositories {'WHERE ' + where if where else ''}", params)
         total = cursor.fetchone()[0]
-        
-        # Get paginated results
-        offset = (page - 1) * per_page
-        sql = f"SELECT * FROM repositories {where_clause} {order_by} LIMIT ? OFFSET ?"
-        cursor.execute(sql, params + [per_page, offset])
-        rows = cursor.fetchall()
-        
-        return [dict(row) for row in rows], total
+    with _count_lock:
+        if len(_count_cache) > 1000:
+            _count_cache.clear()
+        _count_cache[query] = (now, total)
+    return total
+
+def invalidate_count_cache():
+    """Drops every cached count, so the next count_repositories_cached call recounts."""
+    with _count_lock:
+        _count_cache.clear()
+
+def get_repositories_paginated(page: int = 1, per_page: int = 20, sort: str = '-score', query: str = '') -> tuple[List[Dict[str, Any]], int]:
+    """
+    Retrieves paginated repositories from the database with optional search and sorting.
+    The total comes from count_repositories_cached, so it may lag writes by a few seconds.
+    """
+    field, descending = _sort_order(sort)
+    direction = "DESC" if descending else "ASC"
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        where, params = _search_filter(cursor, query)
+        # repo_url breaks ties so pages are stable
+        sql = (
+            f"SELECT * FROM repositories {'WHERE ' + where if where else ''} "
+            f"ORDER BY {field} {direction}, repo_url {direction} LIMIT ? OFFSET ?"
+        )
+        cursor.execute(sql, params + [per_page, (page - 1) * per_page])
+        rows = [dict(row) for row in cursor.fetchall()]
+    return rows, count_repositories_cached(query)
+
+def get_repositories_after(cursor_token: str | None, per_page: int = 20, sort: str = '-score', query: str = '') -> tuple[List[Dict[str, Any]], str | None]:
+    """
+    Keyset pagination: returns the `per_page` repositories following the
+    position encoded in `cursor_token` (the first page when None), and the
+    cursor of the next page, or None on the last page. Each page is an index
+    seek, however deep, and rows written meanwhile never shift a page.
+    """
+    field, descending = _sort_order(sort)
+    direction = "DESC" if descending else "ASC"
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        where, params = _search_filter(cursor, query)
+        conditions = [where] if where else []
+        if cursor_token:
+            value, repo_url = decode_cursor(sort, cursor_token)
+            conditions.append(_seek_condition(field, descending, value))
+            params = params + ([repo_url] if value is None else [value, repo_url])
+        sql = (
+            f"SELECT * FROM repositories {'WHERE ' + ' AND '.join(conditions) if conditions else ''} "
+            f"ORDER BY {field} {direction}, repo_url {direction} LIMIT ?"
+        )
+        # One extra row tells whether there is a next page
+        cursor.execute(sql, params + [per_page + 1])
+        rows = [dict(row) for row in cursor.fetchall()]
+    next_cursor = encode_cursor(sort, rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
 
 def get_dashboard_stats() -> Dict[str, Any]:
-    """Calculates and returns statistics for the dashboard."""
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Total repositories
-            cursor.execute("SELECT COUNT(*) FROM repositories")
-            total_repos = cursor.fetchone()[0]
-
-            # Production-ready repos
-            cursor.execute("SELECT COUNT(*) FROM repositories WHERE category = 'production'")
-            production_repos = cursor.fetchone()[0]
-
-            # Repos with security findings
-            cursor.execute("SELECT COUNT(*) FROM repositories WHERE trufflehog_findings > 0 OR bandit_findings > 0")
-            security_issues = cursor.fetchone()[0]
-
-            # Language breakdown
-            cursor.execute("SELECT language, COUNT(*) FROM repositories WHERE language IS NOT NULL GROUP BY language ORDER BY COUNT(*) DESC LIMIT 10")
-            language_breakdown = [{"name": row[0], "value": row[1]} for row in cursor.fetchall()]
-
-            # Repositories analyzed over time (last 30 days)
-            daily_counts = []
-            today = datetime.now().date()
-            for i in range(30):
-                day = today - timedelta(days=i)
-                next_day = day + timedelta(days=1)
-                cursor.execute("SELECT COUNT(*) FROM repositories WHERE last_processed >= ? AND last_processed < ?", (day, next_day))
-                count = cursor.fetchone()[0]
-                daily_counts.append({"date": day.strftime("%Y-%m-%d"), "count": count})
-            
-            analysis_timeline = list(reversed(daily_counts))
-
-            return {
-                "totalRepositories": total_repos,
-                "productionReady": production_repos,
-                "securityIssues": security_issues,
-                "nonProduction": total_repos - production_repos,
-                "languageBreakdown": language_breakdown,
-                "analysisTimeline": analysis_timeline
-            }
-    except sqlite3.Error as e:
-        print(f"Database error in get_dashboard_stats: {e}")
-        # In case of error, return a default structure to avoid breaking the frontend
+    """
+    Returns statistics for the dashboard, read from the dashboard_counts
+    aggregates. Database errors propagate, so callers never cache or serve
+    zeros in place of real counts.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT metric, count FROM dashboard_counts WHERE metric IN ('total', 'production', 'security')")
+        totals = dict(cursor.fetchall())
+        total_repos = totals.get('total', 0)
+        production_repos = totals.get('production', 0)
+        security_issues = totals.get('security', 0)
+
+        # Language breakdown
+        cursor.execute("SELECT key, count FROM dashboard_counts WHERE metric = 'language' AND count > 0 ORDER BY count DESC LIMIT 10")
+        language_breakdown = [{"name": row[0], "value": row[1]} for row in cursor.fetchall()]
+
+        # Repositories analyzed over time (last 30 days)
+        today = datetime.now().date()
+        days = [today - timedelta(days=i) for i in range(29, -1, -1)]
+        cursor.execute(
+            "SELECT key, count FROM dashboard_counts WHERE metric = 'day' AND key >= ? AND key <= ?",
+            (days[0].strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")),
+        )
+        daily_counts = dict(cursor.fetchall())
+        analysis_timeline = [{"date": day.strftime("%Y-%m-%d"), "count": daily_counts.get(day.strftime("%Y-%m-%d"), 0)} for day in days]
+
         return {
-            "totalRepositories": 0,
-            "productionReady": 0,
-            "securityIssues": 0,
-            "nonProduction": 0,
-            "languageBreakdown": [],
-            "analysisTimeline": []
+            "totalRepositories": total_repos,
+            "productionReady": production_repos,
+            "securityIssues": security_issues,
+            "nonProduction": total_repos - production_repos,
+            "languageBreakdown": language_breakdown,
+            "analysisTimeline": analysis_timeline
         }
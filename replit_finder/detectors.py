@@ -0,0 +1,77 @@
+# replit_finder/detectors.py
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+
+
+@dataclass(frozen=True)
+class Detector:
+    """
+    Declarative repository signal evaluated against a file listing.
+
+    Args:
+        name: Feature name the result is stored under (e.g. "has_dockerfile").
+        paths: Exact repository paths (files or directories) that satisfy the detector.
+        globs: fnmatch patterns matched against full repository paths.
+        min_size: Smallest blob size in bytes that counts as a match.
+        measure: "exists" yields a bool, "size" yields the largest matching blob size.
+    """
+    name: str
+    paths: tuple[str, ...] = ()
+    globs: tuple[str, ...] = ()
+    min_size: int = 0
+    measure: str = "exists"
+
+    def matches(self, path: str) -> bool:
+        return path in self.paths or any(fnmatchcase(path, g) for g in self.globs)
+
+
+DETECTORS: dict[str, Detector] = {}
+
+
+def register_detector(detector: Detector) -> Detector:
+    """Adds (or replaces) a detector in the registry used during enrichment."""
+    if detector.measure not in ("exists", "size"):
+        raise ValueError(f"Unknown detector measure: {detector.measure}")
+    DETECTORS[detector.name] = detector
+    return detector
+
+
+register_detector(Detector("has_ci", paths=(".github/workflows",), globs=(".github/workflows/*",)))
+register_detector(Detector("has_dockerfile", paths=("Dockerfile",)))
+register_detector(Detector("has_procfile", paths=("Procfile",)))
+register_detector(Detector("has_package_json", paths=("package.json",)))
+register_detector(Detector("has_requirements", paths=("requirements.txt",)))
+register_detector(Detector("has_pyproject", paths=("pyproject.toml",)))
+register_detector(Detector("has_replit", paths=(".replit", "replit.nix")))
+register_detector(Detector("has_fly_toml", paths=("fly.toml",)))
+register_detector(Detector(
+    "readme_len",
+    paths=("README.md", "README.rst", "README.txt", "README", "readme.md"),
+    globs=("README*", "readme*", "Readme*"),
+    measure="size",
+))
+
+
+def evaluate(entries: dict[str, int | None], detectors: dict[str, Detector] | None = None) -> dict[str, bool | int]:
+    """
+    Evaluates detectors against `entries`, a mapping of repository path to blob
+    size (None for directories). Returns one feature per detector.
+    """
+    detectors = DETECTORS if detectors is None else detectors
+    features: dict[str, bool | int] = {}
+    for detector in detectors.values():
+        sizes = [
+            size for path, size in entries.items()
+            if detector.matches(path) and (size or 0) >= detector.min_size
+        ]
+        if detector.measure == "size":
+            features[detector.name] = max((size or 0 for size in sizes), default=0)
+        else:
+            features[detector.name] = bool(sizes)
+    return features
+
+
+def literal_paths(detectors: dict[str, Detector] | None = None) -> list[str]:
+    """Returns every exact path referenced by the detectors, for point lookups."""
+    detectors = DETECTORS if detectors is None else detectors
+    return list(dict.fromkeys(path for detector in detectors.values() for path in detector.paths))
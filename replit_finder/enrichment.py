@@ -0,0 +1,156 @@
+# replit_finder/enrichment.py
+import asyncio
+import itertools
+from typing import AsyncIterator, Awaitable, Callable
+
+import aiohttp
+
+from . import database, github_api, offload
+from .config import ENRICH_CONCURRENCY
+from .processed import ProcessedIndex
+
+_STOP = None
+
+
+class EnrichmentExecutor:
+    """
+    Runs an async enrichment worker over repository URLs with a bounded number
+    of workers. Pending repos are picked highest priority first (e.g. the number
+    of pages linking to them); submitting a known repo again with a higher
+    priority moves it forward. Results are yielded by `results()` as they complete.
+    """
+
+    def __init__(self, worker: Callable[[str], Awaitable[dict | None]], concurrency: int = ENRICH_CONCURRENCY):
+        self.worker = worker
+        self.concurrency = max(1, concurrency)
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._results: asyncio.Queue = asyncio.Queue()
+        self._priorities: dict[str, int] = {}
+        self._started: set[str] = set()
+        self._seq = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self._progress = asyncio.Condition()
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+
+    def submit(self, repo_url: str, priority: int = 0):
+        """Queues a repo, or raises the priority of one that has not started yet."""
+        if self._closed:
+            raise RuntimeError("Cannot submit to a closed EnrichmentExecutor")
+        if repo_url in self._started:
+            return
+        known = self._priorities.get(repo_url)
+        if known is not None and known >= priority:
+            return
+        if known is None:
+            self.submitted += 1
+        self._priorities[repo_url] = priority
+        self._queue.put_nowait((-priority, next(self._seq), repo_url))
+        self._start()
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted repos no worker has picked up yet."""
+        return len(self._priorities) - len(self._started)
+
+    async def wait_below(self, limit: int):
+        """Blocks until fewer than `limit` repos are pending; used by producers for backpressure."""
+        async with self._progress:
+            await self._progress.wait_for(lambda: self.pending < limit)
+
+    def close(self):
+        """Signals that no more repos will be submitted; workers exit once the queue drains."""
+        if self._closed:
+            return
+        self._closed = True
+        self._start()
+        for _ in range(self.concurrency):
+            # Sorts after every real entry, so workers only stop once the queue is drained
+            self._queue.put_nowait((float("inf"), next(self._seq), _STOP))
+
+    def _start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def _work(self):
+        while True:
+            _, _, repo_url = await self._queue.get()
+            if repo_url is _STOP:
+                break
+            if repo_url in self._started:
+                continue  # stale entry left behind by a priority bump
+            self._started.add(repo_url)
+            try:
+                result = await self.worker(repo_url)
+            except Exception as e:
+                print(f"[!] Enrichment failed for {repo_url}: {e}")
+                result = None
+            await self._results.put((repo_url, result))
+            async with self._progress:
+                self._progress.notify_all()
+        await self._results.put(_STOP)
+
+    async def results(self) -> AsyncIterator[tuple[str, dict | None]]:
+        """Yields (repo_url, result) pairs as workers finish, until the executor is closed and drained."""
+        self._start()
+        finished = 0
+        while finished < len(self._tasks):
+            item = await self._results.get()
+            if item is _STOP:
+                finished += 1
+                continue
+            self.completed += 1
+            yield item
+
+    async def cancel(self):
+        """Stops all workers without waiting for queued repos."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def enrich_repos(
+    worker: Callable[[str], Awaitable[dict | None]],
+    repo_urls,
+    priorities: dict[str, int] | None = None,
+    concurrency: int = ENRICH_CONCURRENCY,
+) -> AsyncIterator[tuple[str, dict | None]]:
+    """
+    Enriches a known set of repos with bounded concurrency, highest priority first,
+    yielding (repo_url, result) as each one completes.
+    """
+    executor = EnrichmentExecutor(worker, concurrency)
+    priorities = priorities or {}
+    for repo_url in repo_urls:
+        executor.submit(repo_url, priorities.get(repo_url, 0))
+    executor.close()
+    try:
+        async for item in executor.results():
+            yield item
+    finally:
+        await executor.cancel()
+
+
+async def prefetch_repo_features(session: aiohttp.ClientSession, repo_urls, processed: ProcessedIndex | None = None) -> dict[str, dict]:
+    """
+    Enriches the unprocessed GitHub repositories in `repo_urls` through batched GraphQL queries.
+    Returns features keyed by repo URL, ready to be passed to process_repo as `prefetched`.
+    With a `processed` index, repos it does not hold as fresh count as unprocessed.
+    """
+    def unprocessed(urls):
+        return [url for url in urls if not database.is_repo_processed(url)]
+
+    parsed = {url: github_api.parse_github_repo_url(url) for url in repo_urls}
+    candidates = [u for u, p in parsed.items() if p]
+    if processed is not None:
+        urls = [url for url in candidates if not processed.is_fresh(url)]
+    else:
+        # One trip to the database pool for the whole batch
+        urls = await offload.run_db(unprocessed, candidates)
+    keys = {url: parsed[url] for url in urls}
+    if not keys:
+        return {}
+    batched = await github_api.batch_enrich_repos(session, list(keys.values()))
+    print(f"[+] GraphQL enriched {len(batched)}/{len(keys)} repos; the rest fall back to REST")
+    return {url: batched[key] for url, key in keys.items() if key in batched}
@@ -0,0 +1,188 @@
+# replit_finder/frontier.py
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .config import FRONTIER_MAX_RETRIES
+from .database import DB_PATH, configure_connection, get_connection
+
+# Item kinds and states tracked per run
+KINDS = ("query", "page", "repo")
+PENDING, FETCHED, ENRICHED, FAILED = "pending", "fetched", "enriched", "failed"
+
+
+class Frontier:
+    """
+    Disk-backed crawl frontier for one run: the dork queries, candidate pages and
+    repositories it has seen, each with a state (pending, fetched, enriched,
+    failed) and a retry count, plus the page -> repo links found so far.
+    A run interrupted at any point can be resumed from these tables.
+    Items failing FRONTIER_MAX_RETRIES times land in the dead-letter list.
+    """
+
+    def __init__(self, run_id: str, max_retries: int = FRONTIER_MAX_RETRIES):
+        self.run_id = run_id
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        configure_connection(self._conn)
+
+    @classmethod
+    def create(cls, kind: str, params: Dict[str, Any], run_id: str | None = None) -> "Frontier":
+        """Registers a new run and returns its frontier."""
+        frontier = cls(run_id or uuid.uuid4().hex[:12])
+        with frontier._lock:
+            frontier._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, kind, params, status) VALUES (?, ?, ?, 'running')",
+                (frontier.run_id, kind, json.dumps(params)),
+            )
+            frontier._conn.commit()
+        return frontier
+
+    @classmethod
+    def load(cls, run_id: str) -> "Frontier":
+        """Opens the frontier of an existing run; raises KeyError if it does not exist."""
+        frontier = cls(run_id)
+        if frontier.params() is None:
+            frontier.close()
+            raise KeyError(f"Unknown run: {run_id}")
+        frontier.set_status("running")
+        return frontier
+
+    def params(self) -> Dict[str, Any] | None:
+        row = self._conn.execute("SELECT params FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_status(self, status: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                (status, datetime.now(), self.run_id),
+            )
+            self._conn.commit()
+
+    def add(self, kind: str, items) -> None:
+        """Adds items as pending; items already known to the run keep their state."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (run_id, kind, item) VALUES (?, ?, ?)",
+                [(self.run_id, kind, item) for item in items],
+            )
+            self._conn.commit()
+
+    def mark(self, kind: str, item: str, state: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE frontier SET state = ?, last_error = NULL, updated_at = ? WHERE run_id = ? AND kind = ? AND item = ?",
+                (state, datetime.now(), self.run_id, kind, item),
+            )
+            self._conn.commit()
+
+    def fail(self, kind: str, item: str, error: str):
+        """Records a failure; the item stays pending until it runs out of retries."""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE frontier
+                SET retries = retries + 1,
+                    state = CASE WHEN retries + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                    last_error = ?, updated_at = ?
+                WHERE run_id = ? AND kind = ? AND item = ?
+                """,
+                (self.max_retries, error, datetime.now(), self.run_id, kind, item),
+            )
+            self._conn.commit()
+
+    def items(self, kind: str, state: str | None = None) -> List[str]:
+        if state is None:
+            rows = self._conn.execute(
+                "SELECT item FROM frontier WHERE run_id = ? AND kind = ?", (self.run_id, kind)
+            )
+        else:
+            rows = self._conn.execute(
+                "SELECT item FROM frontier WHERE run_id = ? AND kind = ? AND state = ?", (self.run_id, kind, state)
+            )
+        return [row[0] for row in rows]
+
+    def updated_at(self, kind: str, state: str) -> Dict[str, datetime]:
+        """Returns {item: time it last changed state} for the items of `kind` in `state`."""
+        rows = self._conn.execute(
+            "SELECT item, updated_at FROM frontier WHERE run_id = ? AND kind = ? AND state = ?", (self.run_id, kind, state)
+        )
+        return {item: datetime.fromisoformat(at) for item, at in rows}
+
+    def add_links(self, page_url: str, repo_urls):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier_links (run_id, page_url, repo_url) VALUES (?, ?, ?)",
+                [(self.run_id, page_url, repo_url) for repo_url in repo_urls],
+            )
+            self._conn.commit()
+
+    def links(self) -> List[tuple[str, str]]:
+        """Returns every (page_url, repo_url) pair recorded for the run."""
+        return self._conn.execute(
+            "SELECT page_url, repo_url FROM frontier_links WHERE run_id = ?", (self.run_id,)
+        ).fetchall()
+
+    def add_sources(self, query: str, page_urls):
+        """Records that `query` returned the candidate pages `page_urls`."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier_sources (run_id, page_url, query) VALUES (?, ?, ?)",
+                [(self.run_id, page_url, query) for page_url in page_urls],
+            )
+            self._conn.commit()
+
+    def sources(self) -> List[tuple[str, str]]:
+        """Returns every (page_url, query) pair recorded for the run."""
+        return self._conn.execute(
+            "SELECT page_url, query FROM frontier_sources WHERE run_id = ?", (self.run_id,)
+        ).fetchall()
+
+    def retry_failed(self) -> int:
+        """Moves the dead-letter items back to pending with a fresh retry budget."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE frontier SET state = 'pending', retries = 0 WHERE run_id = ? AND state = 'failed'",
+                (self.run_id,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        self._conn.close()
+
+
+def get_run_summary(run_id: str) -> Dict[str, Any] | None:
+    """Returns a run's parameters, status, per-kind state counts and dead-letter list."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT kind, params, status, started_at, updated_at FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        counts: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+        for kind, state, count in conn.execute(
+            "SELECT kind, state, COUNT(*) FROM frontier WHERE run_id = ? GROUP BY kind, state", (run_id,)
+        ):
+            counts.setdefault(kind, {})[state] = count
+        dead_letters = [
+            {"kind": kind, "item": item, "retries": retries, "error": error}
+            for kind, item, retries, error in conn.execute(
+                "SELECT kind, item, retries, last_error FROM frontier WHERE run_id = ? AND state = 'failed'", (run_id,)
+            )
+        ]
+    return {
+        "run_id": run_id,
+        "kind": row[0],
+        "params": json.loads(row[1]),
+        "status": row[2],
+        "started_at": row[3],
+        "updated_at": row[4],
+        "counts": counts,
+        "dead_letters": dead_letters,
+    }
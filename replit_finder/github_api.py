@@ -1,34 +1,141 @@
 # replit_finder/github_api.py
 import re
+import json
 import base64
+import asyncio
 import aiohttp
-from .config import GITHUB_TOKEN, USER_AGENT
+from multidict import CIMultiDict
+
+from . import detectors, http_cache, offload, ratelimit
+from .config import GITHUB_TOKENS, GRAPHQL_BATCH_SIZE, USER_AGENT
+from .http_cache import CachedResponse
+from .ratelimit import RateLimitExceeded
 
 GITHUB_API = "https://api.github.com"
+GITHUB_GRAPHQL = f"{GITHUB_API}/graphql"
+
+GITHUB_REPO_URL_REGEX = re.compile(r"https?://github\.com/([^/]+)/([^/]+)")
 
-def _gh_headers() -> dict[str, str]:
+def _gh_headers(token: str | None = None) -> dict[str, str]:
     """
-    Returns the headers for GitHub API requests.
+    Returns the headers for GitHub API requests made with `token`.
     """
     headers = {"Accept": "application/vnd.github+json", "User-Agent": USER_AGENT}
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    if token:
+        headers["Authorization"] = f"token {token}"
     return headers
 
+def _resource_of(url: str) -> str:
+    """
+    Returns the GitHub rate-limit resource a request to `url` is charged against.
+    """
+    if url.startswith(GITHUB_GRAPHQL):
+        return "graphql"
+    if url.startswith(f"{GITHUB_API}/search/"):
+        return "search"
+    return "core"
+
+def parse_github_repo_url(repo_url: str) -> tuple[str, str] | None:
+    """
+    Extracts (owner, repo) from a GitHub repository URL.
+    """
+    mo = GITHUB_REPO_URL_REGEX.match(repo_url)
+    if not mo:
+        return None
+    return mo.group(1), mo.group(2)
+
+class GitHubAPIError(aiohttp.ClientError):
+    """Raised for GitHub responses with an unexpected HTTP status."""
+    def __init__(self, url: str, status: int):
+        super().__init__(f"{status} for {url}")
+        self.url = url
+        self.status = status
+
+def _raise_for_status(url: str, response: CachedResponse):
+    if response.status >= 400:
+        raise GitHubAPIError(url, response.status)
+
+async def _request(session: aiohttp.ClientSession, method: str, url: str, headers: dict | None = None, timeout: int = 12, **kwargs) -> CachedResponse:
+    """
+    Sends a GitHub request through the rate-limit scheduler.
+    The scheduler picks the pooled token with the most budget left and parks the
+    request until a reset when all are drained; rate-limited responses are retried.
+    Raises RateLimitExceeded if no budget comes back within GITHUB_MAX_PARK_SECONDS.
+    """
+    scheduler = ratelimit.get_scheduler()
+    resource = _resource_of(url)
+    while True:
+        budget = await scheduler.acquire(resource)
+        result = None
+        try:
+            request_headers = {**_gh_headers(budget.token), **(headers or {})}
+            async with session.request(method, url, headers=request_headers, timeout=timeout, **kwargs) as resp:
+                result = CachedResponse(resp.status, CIMultiDict(resp.headers), await resp.read())
+        finally:
+            limited = scheduler.release(
+                budget, result.status if result else None, result.headers if result else None, result.body if result else None
+            )
+        if not limited:
+            return result
+
+async def _get(session: aiohttp.ClientSession, url: str, params: dict | None = None, timeout: int = 12) -> CachedResponse:
+    """
+    Performs a GitHub GET request through the conditional-request cache.
+    Fresh entries are served without a request; stale ones are revalidated with
+    If-None-Match / If-Modified-Since, and a 304 serves the cached body.
+    """
+    cache = http_cache.get_cache()
+    key = http_cache.cache_key(url, params)
+    cached = await offload.run_db(cache.lookup, key)
+    headers = {}
+    if cached:
+        response, fresh, validators = cached
+        if fresh:
+            cache.stats.hits += 1
+            await offload.run_db(cache.touch, key)
+            return response
+        headers.update(validators)
+
+    result = await _request(session, "GET", url, headers=headers, params=params, timeout=timeout)
+    if result.status == 304 and cached:
+        cache.stats.revalidated += 1
+        await offload.run_db(cache.touch, key, revalidated=True)
+        return cached[0]
+    cache.stats.misses += 1
+    await offload.run_db(cache.store, key, url, result)
+    return result
+
+def cache_stats() -> dict:
+    """
+    Returns hit/miss counters of the GitHub response cache for this process.
+    """
+    return http_cache.get_cache().stats.to_dict()
+
+def rate_limit_budget() -> dict:
+    """
+    Returns the live rate-limit budget of every pooled token.
+    """
+    return ratelimit.get_scheduler().snapshot()
+
+def _last_page(response: CachedResponse) -> int | None:
+    link_header = response.headers.get("Link", "")
+    if 'rel="last"' in link_header:
+        if match := re.search(r'&page=(\d+)>; rel="last"', link_header):
+            return int(match.group(1))
+    return None
+
 async def get_github_repo_api(session: aiohttp.ClientSession, owner: str, repo: str) -> dict | None:
     """
-    Gets the GitHub repository API data asynchronously.
+    Gets the GitHub repository API data asynchronously. Returns None for a
+    repository that does not exist (404); network errors and other statuses
+    raise, so callers can tell a missing repo from a failed request.
     """
     url = f"{GITHUB_API}/repos/{owner}/{repo}"
-    try:
-        async with session.get(url, headers=_gh_headers(), timeout=12) as response:
-            if response.status == 404:
-                return None
-            response.raise_for_status()
-            return await response.json()
-    except aiohttp.ClientError as e:
-        print(f"[!] Failed to get repo metadata for {owner}/{repo}: {e}")
+    response = await _get(session, url, timeout=12)
+    if response.status == 404:
         return None
+    _raise_for_status(url, response)
+    return response.json()
 
 async def check_github_path_exists(session: aiohttp.ClientSession, owner: str, repo: str, path: str) -> bool:
     """
@@ -36,8 +143,8 @@ async def check_github_path_exists(session: aiohttp.ClientSession, owner: str, r
     """
     url = f"{GITHUB_API}/repos/{owner}/{repo}/contents/{path}"
     try:
-        async with session.get(url, headers=_gh_headers(), timeout=10) as response:
-            return response.status == 200
+        response = await _get(session, url, timeout=10)
+        return response.status == 200
     except aiohttp.ClientError:
         return False
 
@@ -47,15 +154,14 @@ async def get_commit_count(session: aiohttp.ClientSession, owner: str, repo: str
     """
     url = f"{GITHUB_API}/repos/{owner}/{repo}/commits"
     try:
-        async with session.get(url, headers=_gh_headers(), params={"per_page": "1"}, timeout=12) as response:
-            if response.status == 404:
-                return 0
-            response.raise_for_status()
-            link_header = response.headers.get("Link", "")
-            if 'rel="last"' in link_header:
-                if match := re.search(r'&page=(\d+)>; rel="last"', link_header):
-                    return int(match.group(1))
-            return len(await response.json())
+        response = await _get(session, url, params={"per_page": "1"}, timeout=12)
+        if response.status == 404:
+            return 0
+        _raise_for_status(url, response)
+        last_page = _last_page(response)
+        if last_page is not None:
+            return last_page
+        return len(response.json())
     except (aiohttp.ClientError, ValueError):
         return 0
 
@@ -65,15 +171,14 @@ async def get_contributor_count(session: aiohttp.ClientSession, owner: str, repo
     """
     url = f"{GITHUB_API}/repos/{owner}/{repo}/contributors"
     try:
-        async with session.get(url, headers=_gh_headers(), params={"per_page": "1"}, timeout=12) as response:
-            if response.status in [404, 202]:  # 202 for large repos
-                return 0
-            response.raise_for_status()
-            link_header = response.headers.get("Link", "")
-            if 'rel="last"' in link_header:
-                if match := re.search(r'&page=(\d+)>; rel="last"', link_header):
-                    return int(match.group(1))
-            return len(await response.json())
+        response = await _get(session, url, params={"per_page": "1"}, timeout=12)
+        if response.status in [404, 202]:  # 202 for large repos
+            return 0
+        _raise_for_status(url, response)
+        last_page = _last_page(response)
+        if last_page is not None:
+            return last_page
+        return len(response.json())
     except (aiohttp.ClientError, ValueError):
         return 0
 
@@ -83,11 +188,11 @@ async def get_readme_len(session: aiohttp.ClientSession, owner: str, repo: str)
     """
     url = f"{GITHUB_API}/repos/{owner}/{repo}/readme"
     try:
-        async with session.get(url, headers=_gh_headers(), timeout=10) as response:
-            if response.status == 200:
-                data = await response.json()
-                content = base64.b64decode(data.get("content", "")).decode("utf-8", errors="ignore")
-                return len(content)
+        response = await _get(session, url, timeout=10)
+        if response.status == 200:
+            data = response.json()
+            content = base64.b64decode(data.get("content", "")).decode("utf-8", errors="ignore")
+            return len(content)
     except (aiohttp.ClientError, ValueError):
         pass
     return 0
@@ -98,15 +203,151 @@ async def search_repositories(session: aiohttp.ClientSession, query: str, per_pa
     Returns a list of repository URLs.
     """
     url = f"{GITHUB_API}/search/repositories"
-    headers = _gh_headers()
     params = {"q": query, "sort": "stars", "order": "desc", "per_page": per_page}
     repo_urls = []
     try:
-        async with session.get(url, headers=headers, params=params) as response:
-            response.raise_for_status()
-            data = await response.json()
-            for item in data.get("items", []):
-                repo_urls.append(item["html_url"])
-    except aiohttp.ClientError as e:
+        response = await _get(session, url, params=params, timeout=30)
+        _raise_for_status(url, response)
+        data = response.json()
+        for item in data.get("items", []):
+            repo_urls.append(item["html_url"])
+    except (aiohttp.ClientError, ValueError, RateLimitExceeded) as e:
         print(f"[!] GitHub repository search failed: {e}")
     return repo_urls
+
+async def get_repo_tree(session: aiohttp.ClientSession, owner: str, repo: str, ref: str) -> tuple[dict[str, int | None], bool] | None:
+    """
+    Lists every path of a repository at `ref` with one recursive git trees request.
+    Returns ({path: blob size, or None for directories}, truncated), or None on failure.
+    """
+    url = f"{GITHUB_API}/repos/{owner}/{repo}/git/trees/{ref}"
+    try:
+        response = await _get(session, url, params={"recursive": "1"}, timeout=20)
+        if response.status in (404, 409):  # 409 for empty repositories
+            return {}, False
+        _raise_for_status(url, response)
+        data = response.json()
+    except (aiohttp.ClientError, ValueError) as e:
+        print(f"[!] Failed to list tree for {owner}/{repo}: {e}")
+        return None
+    entries = {
+        item["path"]: item.get("size") if item.get("type") == "blob" else None
+        for item in data.get("tree", [])
+    }
+    return entries, bool(data.get("truncated"))
+
+async def detect_repo_features(session: aiohttp.ClientSession, owner: str, repo: str, ref: str) -> dict:
+    """
+    Evaluates the detector registry against the repository tree at `ref`.
+    Costs one request regardless of how many detectors are registered; only a
+    truncated tree (very large repositories) falls back to per-path lookups.
+    """
+    tree = await get_repo_tree(session, owner, repo, ref)
+    if tree is None:
+        entries, truncated = {}, True
+    else:
+        entries, truncated = tree
+    features = detectors.evaluate(entries)
+    if truncated:
+        missing = [
+            path for path in detectors.literal_paths()
+            if path not in entries
+        ]
+        found = await asyncio.gather(*(check_github_path_exists(session, owner, repo, path) for path in missing))
+        # Sizes are unknown for paths confirmed this way, so size detectors keep the README fallback
+        entries.update({path: None for path, ok in zip(missing, found) if ok})
+        features = detectors.evaluate(entries)
+        if not features.get("readme_len"):
+            features["readme_len"] = await get_readme_len(session, owner, repo)
+    return features
+
+def _build_enrichment_query(repos: list[tuple[str, str]]) -> tuple[str, dict[str, str]]:
+    """
+    Builds an aliased GraphQL query that enriches several repositories at once.
+    Returns the query text and its variables.
+    """
+    var_defs = []
+    variables = {}
+    blocks = []
+    path_fields = "\n".join(
+        f'    p{i}: object(expression: {json.dumps("HEAD:" + path)}) {{ __typename ... on Blob {{ byteSize }} }}'
+        for i, path in enumerate(detectors.literal_paths())
+    )
+    for i, (owner, repo) in enumerate(repos):
+        var_defs.append(f"$o{i}: String!, $n{i}: String!")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = repo
+        blocks.append(f"""  r{i}: repository(owner: $o{i}, name: $n{i}) {{
+    nameWithOwner
+    databaseId
+    stargazerCount
+    forkCount
+    description
+    isArchived
+    licenseInfo {{ name }}
+    primaryLanguage {{ name }}
+    defaultBranchRef {{ target {{ ... on Commit {{ history {{ totalCount }} }} }} }}
+{path_fields}
+  }}""")
+    query = f"query({', '.join(var_defs)}) {{\n" + "\n".join(blocks) + "\n}"
+    return query, variables
+
+def _parse_enrichment_node(node: dict) -> dict:
+    """
+    Converts one aliased repository node into the feature dict used by process_repo.
+    """
+    target = (node.get("defaultBranchRef") or {}).get("target") or {}
+    entries = {
+        path: node[f"p{i}"].get("byteSize")
+        for i, path in enumerate(detectors.literal_paths())
+        if node.get(f"p{i}")
+    }
+    return {
+        "full_name": node.get("nameWithOwner"),
+        "repo_id": node.get("databaseId"),
+        "stars": node.get("stargazerCount", 0),
+        "forks": node.get("forkCount", 0),
+        "license": (node.get("licenseInfo") or {}).get("name"),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "description": node.get("description"),
+        "archived": node.get("isArchived", False),
+        "commit_count": (target.get("history") or {}).get("totalCount", 0),
+        **detectors.evaluate(entries),
+    }
+
+async def graphql_enrich_repos(session: aiohttp.ClientSession, repos: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+    """
+    Fetches metadata, commit totals and the detector paths (file presence, README
+    size) for a batch of repositories with a single aliased GraphQL query.
+    Repositories missing from the result should be enriched through the REST functions.
+    """
+    if not repos or not GITHUB_TOKENS:
+        return {}
+    query, variables = _build_enrichment_query(repos)
+    try:
+        response = await _request(session, "POST", GITHUB_GRAPHQL, json={"query": query, "variables": variables}, timeout=30)
+        _raise_for_status(GITHUB_GRAPHQL, response)
+        payload = response.json()
+    except (aiohttp.ClientError, ValueError, RateLimitExceeded) as e:
+        print(f"[!] GraphQL enrichment failed for {len(repos)} repos: {e}")
+        return {}
+
+    data = payload.get("data") or {}
+    results = {}
+    for i, key in enumerate(repos):
+        node = data.get(f"r{i}")
+        if node:
+            results[key] = _parse_enrichment_node(node)
+    return results
+
+async def batch_enrich_repos(session: aiohttp.ClientSession, repos: list[tuple[str, str]], batch_size: int = GRAPHQL_BATCH_SIZE) -> dict[tuple[str, str], dict]:
+    """
+    Enriches repositories through GraphQL in batches of `batch_size`.
+    Returns a mapping of (owner, repo) to features; absent keys need the REST fallback.
+    """
+    unique = list(dict.fromkeys(repos))
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    results = {}
+    for batch_result in await asyncio.gather(*(graphql_enrich_repos(session, b) for b in batches)):
+        results.update(batch_result)
+    return results
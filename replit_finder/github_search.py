@@ -1,12 +1,12 @@
 # replit_finder/github_search.py
-import asyncio
-import csv
 import aiohttp
 
-from . import database
-from .config import PRODUCTION_SCORE_THRESHOLD
+from . import canonical, database, offload, sinks, writer
+from .config import ENRICH_CONCURRENCY, PRODUCTION_SCORE_THRESHOLD
+from .enrichment import enrich_repos, prefetch_repo_features
 from .main import process_repo
-from .github_api import search_repositories
+from .processed import ProcessedIndex
+from .github_api import cache_stats, rate_limit_budget, search_repositories
 
 async def search_github_repos(
     query: str,
@@ -14,38 +14,62 @@ async def search_github_repos(
     clone: bool,
     min_score: int,
     out_csv: str,
-):
+    progress_callback=None,
+    concurrency: int = ENRICH_CONCURRENCY,
+    out_format: str | None = None,
+    sort_output: bool = True,
+) -> int:
     """
     Searches GitHub for repositories, filters them, and analyzes them.
+    Rows stream into `out_csv` as they complete; returns the number of rows.
     """
-    database.init_db()
+    await offload.run_db(database.init_db)
+    failed_writes = writer.get_writer().stats.failed
     print(f"[+] Starting GitHub search for: {query}")
 
     # Add min_stars filter to the query
     full_query = f"{query} stars:>{min_stars}"
 
+    processed = await offload.run_db(ProcessedIndex.load, min_score)
+
     async with aiohttp.ClientSession() as session:
         repo_urls = await search_repositories(session, full_query, per_page=100)
+        # Same lowercase keys the processed index and repositories table use
+        repo_urls = list(dict.fromkeys(canonical.canonical_repo_url(url) or url for url in repo_urls))
         print(f"[+] Found {len(repo_urls)} repositories from GitHub search.")
 
-        # Process repositories concurrently
-        process_tasks = [
-            process_repo(session, repo_url, min_score, clone)
-            for repo_url in repo_urls
-        ]
-        final_rows = await asyncio.gather(*process_tasks)
-        final_rows = [row for row in final_rows if row]
-
-    # Write to CSV
-    if final_rows:
-        # I need to get the keys from the dictionary, but it can be empty
-        # I will get the keys from the first element if it exists
-        if final_rows:
-            with open(out_csv, "w", newline="", encoding="utf-8") as f:
-                # The keys in final_rows[0] should be correct since process_repo returns a dict with all keys
-                writer = csv.DictWriter(f, fieldnames=final_rows[0].keys())
-                writer.writeheader()
-                writer.writerows(sorted(final_rows, key=lambda x: x["score"], reverse=True))
+        prefetched = await prefetch_repo_features(session, repo_urls, processed)
+
+        # Process repositories concurrently, in search (star) order
+        priorities = {url: len(repo_urls) - i for i, url in enumerate(repo_urls)}
+        row_count = 0
+        processed_count = 0
+
+        async def worker(repo_url: str) -> dict | None:
+            return await process_repo(session, repo_url, min_score, clone, prefetched=prefetched.get(repo_url), processed=processed)
+
+        # The API runs searches without an output file and reads results from the database
+        sink = sinks.open_sink(out_csv, out_format, sort_by="score" if sort_output else None) if out_csv else None
+        try:
+            async for _, result in enrich_repos(worker, repo_urls, priorities, concurrency):
+                if result:
+                    row_count += 1
+                    if sink:
+                        sink.write(result)
+                processed_count += 1
+                if progress_callback:
+                    progress_callback(f"Processing repository {processed_count}/{len(repo_urls)}", processed_count, len(repo_urls))
+        finally:
+            await writer.flush_async(failed_writes)
+            if sink:
+                await offload.run_io(sink.close)
+
+    if row_count:
+        if sink:
             print(f"[+] Finished. Results written to {out_csv}")
     else:
         print("[+] Finished. No new production repositories found.")
+    print(f"[+] Repository writes: {writer.writer_stats()}")
+    print(f"[+] GitHub cache: {cache_stats()}")
+    print(f"[+] GitHub budget: {rate_limit_budget()}")
+    return row_count
@@ -0,0 +1,192 @@
+# replit_finder/http_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from urllib.parse import urlencode, urlparse
+
+from multidict import CIMultiDict
+
+from .config import GITHUB_CACHE_MAX_MB
+from .database import DB_PATH
+
+CACHE_PATH = os.getenv("GITHUB_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "github_cache.db"))
+
+# Seconds a cached response is served without contacting GitHub at all.
+# After that it is revalidated with If-None-Match / If-Modified-Since.
+ENDPOINT_TTLS = {
+    "search": 60 * 60,
+    "commits": 6 * 60 * 60,
+    "contributors": 24 * 60 * 60,
+    "contents": 24 * 60 * 60,
+    "readme": 24 * 60 * 60,
+    "git": 24 * 60 * 60,
+    "repo": 12 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+# Only these headers are needed by github_api once a body is served from cache
+STORED_HEADERS = ("ETag", "Last-Modified", "Link", "Content-Type")
+CACHEABLE_STATUSES = {200, 404}
+
+
+@dataclass
+class CachedResponse:
+    """A GitHub response body with the headers github_api reads from it."""
+    status: int
+    headers: CIMultiDict
+    body: bytes
+    from_cache: bool = False
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+def endpoint_of(url: str) -> str:
+    """Classifies a GitHub API URL into one of the ENDPOINT_TTLS keys."""
+    parts = urlparse(url).path.strip("/").split("/")
+    if parts and parts[0] == "search":
+        return "search"
+    if len(parts) >= 4 and parts[0] == "repos":
+        return parts[3]
+    if len(parts) == 3 and parts[0] == "repos":
+        return "repo"
+    return "other"
+
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    """Builds the cache key for a URL and its query parameters."""
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """SQLite-backed conditional-request cache for GitHub GET responses."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = GITHUB_CACHE_MAX_MB * 1024 * 1024, ttls: dict | None = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = {**ENDPOINT_TTLS, **(ttls or {})}
+        self.stats = CacheStats()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                endpoint TEXT,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER,
+                stored_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_access ON http_cache (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    def lookup(self, key: str) -> tuple[CachedResponse, bool, dict[str, str]] | None:
+        """
+        Returns (response, fresh, validators) for a cached key, or None.
+        `validators` holds the conditional headers to send when the entry is stale.
+        """
+        row = self._conn.execute(
+            "SELECT endpoint, status, headers, body, etag, last_modified, stored_at FROM http_cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        endpoint, status, headers, body, etag, last_modified, stored_at = row
+        fresh = time.time() - stored_at < self.ttls.get(endpoint, DEFAULT_TTL)
+        validators = {}
+        if etag:
+            validators["If-None-Match"] = etag
+        if last_modified:
+            validators["If-Modified-Since"] = last_modified
+        response = CachedResponse(status, CIMultiDict(json.loads(headers)), body, from_cache=True)
+        return response, fresh, validators
+
+    def touch(self, key: str, revalidated: bool = False):
+        """Marks an entry as used; a revalidated entry also restarts its TTL."""
+        now = time.time()
+        if revalidated:
+            self._conn.execute("UPDATE http_cache SET last_access = ?, stored_at = ? WHERE key = ?", (now, now, key))
+        else:
+            self._conn.execute("UPDATE http_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+    def store(self, key: str, url: str, response: CachedResponse):
+        """Stores a response if its status is cacheable, then enforces the size bound."""
+        if response.status not in CACHEABLE_STATUSES:
+            return
+        headers = {h: response.headers[h] for h in STORED_HEADERS if h in response.headers}
+        size = len(response.body)
+        now = time.time()
+        old = self._conn.execute("SELECT size FROM http_cache WHERE key = ?", (key,)).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, endpoint_of(url), response.status, json.dumps(headers), response.body,
+             headers.get("ETag"), headers.get("Last-Modified"), size, now, now),
+        )
+        self._conn.commit()
+        self._total_bytes += size - (old[0] if old else 0)
+        self.stats.stores += 1
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drops least recently used entries until the cache is below 90% of its size bound."""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM http_cache ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM http_cache WHERE key = ?", doomed)
+        self._conn.commit()
+        self.stats.evictions += len(doomed)
+
+    def clear(self):
+        """Removes every cached response."""
+        self._conn.execute("DELETE FROM http_cache")
+        self._conn.commit()
+        self._total_bytes = 0
+
+    def close(self):
+        self._conn.close()
+
+
+_cache: HttpCache | None = None
+
+
+def get_cache() -> HttpCache:
+    """Returns the process-wide GitHub response cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = HttpCache()
+    return _cache
@@ -1,60 +1,118 @@
 # replit_finder/main.py
 import asyncio
-import csv
-import re
-from collections import defaultdict
-from urllib.parse import urlparse
+from typing import Iterable
 import aiohttp
 
-from . import analysis, cloner, github_api, scraper, search, database
-from .config import DEFAULT_MAX_RESULTS, PRODUCTION_SCORE_THRESHOLD
+from . import analysis, budget, canonical, cloner, github_api, database, offload, page_cache, scraper, search_cache, sinks, writer
+from .processed import ProcessedIndex
+from .config import BUDGET_EXPLORATION, DEFAULT_MAX_RESULTS, ENRICH_CONCURRENCY, FETCH_CONCURRENCY, PAGE_CACHE_MAX_MB, PRODUCTION_SCORE_THRESHOLD, SEARCH_CACHE_TTL
+from .frontier import Frontier
+from .pipeline import ReplitPipeline
 
 
-async def process_repo(session: aiohttp.ClientSession, repo_url: str, min_score: int, clone: bool, mapping_pages_to_repos: dict | None = None) -> dict | None:
-    """Processes a single repository: fetches data, scores it, and optionally clones it."""
-    if database.is_repo_processed(repo_url):
+async def _fetch_repo_features_rest(session: aiohttp.ClientSession, owner: str, repo: str) -> dict | None:
+    """Fetches the enrichment features of a repository through the REST API."""
+    meta = await github_api.get_github_repo_api(session, owner, repo)
+    if not meta:
+        return None
+
+    # File signals and README size come from a single git trees request
+    commit_count, detected = await asyncio.gather(
+        github_api.get_commit_count(session, owner, repo),
+        github_api.detect_repo_features(session, owner, repo, meta.get("default_branch") or "HEAD"),
+    )
+    return {
+        "full_name": meta.get("full_name"),
+        "repo_id": meta.get("id"),
+        "stars": meta.get("stargazers_count", 0),
+        "forks": meta.get("forks_count", 0),
+        "license": meta.get("license", {}).get("name") if meta.get("license") else None,
+        "language": meta.get("language"),
+        "description": meta.get("description"),
+        "archived": meta.get("archived", False),
+        "commit_count": commit_count,
+        **detected,
+    }
+
+
+async def _is_done(repo_url: str, processed: ProcessedIndex | None) -> bool:
+    if writer.get_writer().contains(repo_url):
+        return True
+    if processed is not None:
+        return processed.is_fresh(repo_url)
+    return await offload.run_db(database.is_repo_processed, repo_url)
+
+
+async def process_repo(
+    session: aiohttp.ClientSession,
+    repo_url: str,
+    min_score: int,
+    clone: bool,
+    linking_pages: Iterable[str] | None = None,
+    prefetched: dict | None = None,
+    processed: ProcessedIndex | None = None,
+) -> dict | None:
+    """
+    Processes a single repository: fetches data, scores it, and optionally clones it.
+    `linking_pages` are the candidate pages the repo was found on.
+    `prefetched` holds features already fetched by github_api.batch_enrich_repos;
+    without it the repository is enriched through the REST API.
+    With a `processed` index, only repos it holds as fresh are skipped (stale
+    ones are re-enriched); without it any stored repo is skipped.
+    Returns None only for deliberate skips (processed, missing, archived or
+    not a GitHub repo); transient failures such as network errors raise.
+    """
+    # Stored repos are keyed by their canonical (lowercase) URL
+    repo_url = canonical.canonical_repo_url(repo_url) or repo_url
+    if await _is_done(repo_url, processed):
         print(f"[-] Skipping already processed repo: {repo_url}")
         return None
 
     print(f"[+] Processing repo {repo_url}")
-    mo = re.match(r"https?://github\.com/([^/]+)/([^/]+)", repo_url)
-    if not mo:
+    parsed = github_api.parse_github_repo_url(repo_url)
+    if not parsed:
         print(f"[-] Skipping non-github or unparseable repo: {repo_url}")
         return None
-    owner, repo = mo.group(1), mo.group(2)
+    owner, repo = parsed
 
-    meta = await github_api.get_github_repo_api(session, owner, repo)
-    if not meta:
-        print(f"[!] Repo metadata could not be retrieved: {owner}/{repo}")
-        return None
+    try:
+        if prefetched is not None:
+            features = dict(prefetched)
+        else:
+            features = await _fetch_repo_features_rest(session, owner, repo)
+            if not features:
+                print(f"[-] Repo not found on GitHub; skipping: {owner}/{repo}")
+                return None
 
-    if meta.get("archived", False):
-        print(f"[-] Repo is archived; skipping: {owner}/{repo}")
-        return None
+        if features.pop("archived", False):
+            print(f"[-] Repo is archived; skipping: {owner}/{repo}")
+            return None
 
-    # Gather all GitHub API calls concurrently
-    tasks = {
-        "commit_count": github_api.get_commit_count(session, owner, repo),
-        "contributor_count": github_api.get_contributor_count(session, owner, repo),
-        "has_ci": github_api.check_github_path_exists(session, owner, repo, ".github/workflows"),
-        "has_dockerfile": github_api.check_github_path_exists(session, owner, repo, "Dockerfile"),
-        "has_procfile": github_api.check_github_path_exists(session, owner, repo, "Procfile"),
-        "has_package_json": github_api.check_github_path_exists(session, owner, repo, "package.json"),
-        "has_requirements": github_api.check_github_path_exists(session, owner, repo, "requirements.txt"),
-        "readme_len": github_api.get_readme_len(session, owner, repo),
-    }
-    results = await asyncio.gather(*tasks.values())
-    enriched_features = dict(zip(tasks.keys(), results))
+        # Remember GitHub's own name for this repo so renamed or differently spelled links merge before any API call
+        full_name, repo_id = features.pop("full_name", None), features.pop("repo_id", None)
+        if full_name:
+            canonical_url = canonical.canonical_repo_url(canonical.github_url(full_name))
+            await offload.run_db(database.insert_repo_aliases, [(alias, canonical_url, repo_id) for alias in {repo_url, canonical_url}])
+            if canonical_url != repo_url:
+                if await _is_done(canonical_url, processed):
+                    print(f"[-] {repo_url} is {full_name}, which is already processed; skipping")
+                    return None
+                repo_url = canonical_url
+            # The key is lowercase; owner and repo keep GitHub's casing
+            owner, repo = full_name.split("/", 1)
+
+        # GraphQL has no contributor total, so this one stays on REST for both paths
+        features["contributor_count"] = await github_api.get_contributor_count(session, owner, repo)
+    except github_api.RateLimitExceeded as e:
+        # Never store a partially enriched row; the frontier keeps the repo pending for a retry
+        print(f"[!] {e}; leaving {owner}/{repo} unprocessed")
+        raise
 
     enriched = {
         "repo_url": repo_url,
         "owner": owner,
         "repo": repo,
-        "stars": meta.get("stargazers_count", 0),
-        "forks": meta.get("forks_count", 0),
-        "license": meta.get("license", {}).get("name") if meta.get("license") else None,
-        "language": meta.get("language"),
-        **enriched_features,
+        **features,
         "trufflehog_findings": 0, # Default values
         "bandit_findings": 0,
         "total_files": 0,
@@ -64,15 +122,15 @@ async def process_repo(session: aiohttp.ClientSession, repo_url: str, min_score:
 
     if clone:
         target_name = f"cloned_repos/{owner}_{repo}"
-        ok = cloner.git_clone(repo_url, target_name, depth=1)
+        # Clone and scanners run as subprocesses, so other repos keep enriching meanwhile
+        ok = await cloner.git_clone_async(repo_url, target_name, depth=1)
         if ok:
             # Run local analysis only if clone is successful
-            local_stats = analysis.analyze_local_repo(target_name)
+            local_stats = await analysis.analyze_local_repo_async(target_name)
             enriched.update(local_stats)
 
-    if mapping_pages_to_repos:
-        pages = [page for page, repos in mapping_pages_to_repos.items() if repo_url in repos]
-        enriched["pages_linking"] = ";".join(pages)
+    if linking_pages:
+        enriched["pages_linking"] = ";".join(sorted(linking_pages))
 
     enriched["score"] = analysis.score_repo(enriched)
 
@@ -106,9 +164,14 @@ async def process_repo(session: aiohttp.ClientSession, repo_url: str, min_score:
         'bandit_findings': enriched.get('bandit_findings'),
         'pages_linking': enriched.get('pages_linking'),
         'language': enriched.get('language'),
+        'description': enriched.get('description'),
     }
 
-    database.insert_repository(final_data_for_db)
+    # Batched with other rows by the writer thread. The repo only counts as processed
+    # (and enriched in the frontier) once its row is stored; WriteFailed leaves it to be retried.
+    await asyncio.wrap_future(writer.get_writer().put(final_data_for_db))
+    if processed is not None:
+        processed.add(repo_url)
     return enriched
 
 
@@ -119,88 +182,121 @@ async def find_production_repl_apps(
     min_score: int = PRODUCTION_SCORE_THRESHOLD,
     out_csv: str = "production_replit_projects.csv",
     progress_callback=None,
-):
+    concurrency: int = ENRICH_CONCURRENCY,
+    fetch_concurrency: int = FETCH_CONCURRENCY,
+    run_id: str | None = None,
+    resume: bool = False,
+    retry_failed: bool = False,
+    out_format: str | None = None,
+    sort_output: bool = True,
+    refresh_search: bool = False,
+    incremental: bool = False,
+    result_budget: int | None = None,
+    exploration: float = BUDGET_EXPLORATION,
+) -> int:
     """
     Main orchestration function to find production-grade Replit apps.
+    Every run is checkpointed under `run_id` (generated when omitted); with
+    `resume` the stored run continues where it stopped, using its original
+    queries and settings. `retry_failed` also re-queues its dead-letter items.
+    Rows stream into `out_csv` (CSV, JSONL or Parquet, see sinks.open_sink),
+    sorted by score unless `sort_output` is False. Search results cached
+    within SEARCH_CACHE_TTL are reused unless `refresh_search`. With
+    `incremental` each dork only asks for results newer than its last
+    successful search, and pages fetched by earlier runs are skipped.
+    A `result_budget` replaces the per-query `max_results` with a total quota
+    split by each dork's past yield (see budget.allocate_budget).
+    Returns the number of rows.
     """
-    database.init_db()
-    print("[+] Starting run")
+    await offload.run_db(database.init_db)
+    failed_writes = writer.get_writer().stats.failed
+
+    if resume:
+        frontier = await offload.run_db(Frontier.load, run_id)
+        params = await offload.run_db(frontier.params)
+        queries, max_results, min_score, clone = params["queries"], params["max_results"], params["min_score"], params["clone"]
+        incremental = params.get("incremental", False)
+        query_results = params.get("query_results")
+        if retry_failed:
+            print(f"[+] Re-queued {await offload.run_db(frontier.retry_failed)} failed items")
+    else:
+        # Use default dorks if no queries provided
+        if not queries:
+            with open("dorks.txt", "r") as f:
+                queries = [line.strip() for line in f if line.strip()]
+        query_results = None
+        if result_budget is not None:
+            yields = await offload.run_db(database.get_dork_yields, queries)
+            query_results = budget.allocate_budget(
+                queries, {query: budget.DorkYield(**counts) for query, counts in yields.items()}, result_budget, exploration
+            )
+            for query in sorted(queries, key=query_results.get, reverse=True):
+                print(f"[+] Budget {query_results[query]:5d} results: {query}")
+            # Dorks left without a share are not searched this run
+            queries = [query for query in queries if query_results[query] > 0]
+        frontier = await offload.run_db(Frontier.create, "replit-find", {
+            "queries": queries,
+            "max_results": max_results,
+            "min_score": min_score,
+            "clone": clone,
+            "incremental": incremental,
+            "query_results": query_results,
+        }, run_id)
+    print(f"[+] Starting run {frontier.run_id} (resume with --resume {frontier.run_id})")
     
     if progress_callback:
         progress_callback("Initializing search...", 0, 100)
 
-    # Use default dorks if no queries provided
-    if not queries:
-        with open("dorks.txt", "r") as f:
-            queries = [line.strip() for line in f if line.strip()]
-
-    async with aiohttp.ClientSession() as session:
-        # Search for candidates
-        if progress_callback:
-            progress_callback("Searching for candidate URLs...", 10, 100)
-            
-        search_tasks = [search.search_query(session, q, num=max_results) for q in queries]
-        search_results = await asyncio.gather(*search_tasks)
-        
-        candidates = set()
-        for result_list in search_results:
-            for u in result_list:
-                parsed = urlparse(u)
-                if parsed.netloc.endswith("repl.co") or parsed.netloc.endswith("replit.com"):
-                    candidates.add(u.split("#")[0].split("?")[0])
-        
-        print(f"[+] Collected {len(candidates)} unique Replit candidate URLs")
-        
-        if progress_callback:
-            progress_callback("Fetching HTML content...", 30, 100)
-
-        # Fetch HTML and extract repo links
-        fetch_tasks = [scraper.fetch_html(session, url) for url in candidates]
-        html_contents = await asyncio.gather(*fetch_tasks)
-        
-        repo_set = set()
-        mapping_pages_to_repos = defaultdict(set)
-        for i, url in enumerate(candidates):
-            html = html_contents[i]
-            if not html:
-                continue
-            repo_links = scraper.extract_repo_links(html)
-            for r in repo_links:
-                repo_set.add(r)
-                mapping_pages_to_repos[url].add(r)
-
-        print(f"[+] Found {len(repo_set)} unique repos referenced from candidate pages")
-        
-        if progress_callback:
-            progress_callback("Processing repositories...", 50, len(repo_set))
-
-        # Process repositories concurrently
-        final_rows = []
-        processed_count = 0
-        
-        for repo_url in repo_set:
-            result = await process_repo(session, repo_url, min_score, clone, mapping_pages_to_repos)
-            if result:
-                final_rows.append(result)
-            
-            processed_count += 1
+    # Loaded once, so known repos are skipped without a database round trip each
+    processed = await offload.run_db(ProcessedIndex.load, min_score)
+    print(f"[+] Processed repositories: {processed.stats.to_dict()}")
+
+    sink = sinks.open_sink(out_csv, out_format, sort_by="score" if sort_output else None) if out_csv else None
+    row_count = 0
+    try:
+        async with aiohttp.ClientSession() as session:
+            async def process(repo_url: str, linking_pages: set[str], prefetched: dict | None) -> dict | None:
+                return await process_repo(session, repo_url, min_score, clone, linking_pages, prefetched, processed)
+
+            pipeline = ReplitPipeline(
+                session, process, frontier, max_results, concurrency, fetch_concurrency, progress_callback,
+                refresh_search, incremental, query_results, processed,
+            )
+            if progress_callback:
+                progress_callback("Searching for candidate URLs...", 10, 100)
+
+            # Stages run concurrently: enrichment starts as soon as the first repos are found
+            async for row in pipeline.run(queries):
+                row_count += 1
+                if sink:
+                    sink.write(row)
+    except BaseException:
+        await offload.run_db(frontier.set_status, "interrupted")
+        await offload.run_db(frontier.close)
+        raise
+    finally:
+        # Rows found before an interruption are still written, to the database as well as the output file
+        await writer.flush_async(failed_writes)
+        if sink:
             if progress_callback:
-                progress_callback(f"Processing repository {processed_count}/{len(repo_set)}", processed_count, len(repo_set))
-
-    # Write to CSV if specified
-    if out_csv and final_rows:
-        if progress_callback:
-            progress_callback("Writing results to CSV...", 90, 100)
-            
-        with open(out_csv, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=final_rows[0].keys())
-            writer.writeheader()
-            writer.writerows(sorted(final_rows, key=lambda x: x["score"], reverse=True))
-        
-        print(f"[+] Finished. Results written to {out_csv}")
+                progress_callback("Writing results...", 90, 100)
+            # A sorted sink writes the whole file here
+            await offload.run_io(sink.close)
+            print(f"[+] {sink.rows} results written to {out_csv}")
+    await offload.run_db(frontier.set_status, "completed")
+    await offload.run_db(frontier.close)
     
     if progress_callback:
         progress_callback("Search completed successfully", 100, 100)
     
-    print(f"[+] Found {len(final_rows)} repositories")
-    return final_rows
\ No newline at end of file
+    print(f"[+] Found {row_count} repositories")
+    if SEARCH_CACHE_TTL > 0:
+        print(f"[+] Search cache: {search_cache.search_cache_stats()}")
+    print(f"[+] Repository writes: {writer.writer_stats()}")
+    print(f"[+] Page fetches: {scraper.fetch_stats()}")
+    print(f"[+] Busiest hosts: {pipeline.hosts.stats(top=10)}")
+    if PAGE_CACHE_MAX_MB > 0:
+        print(f"[+] Page cache: {page_cache.page_cache_stats()}")
+    print(f"[+] GitHub cache: {github_api.cache_stats()}")
+    print(f"[+] GitHub budget: {github_api.rate_limit_budget()}")
+    return row_count
\ No newline at end of file
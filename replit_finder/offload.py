@@ -0,0 +1,73 @@
+# replit_finder/offload.py
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .config import IO_THREADS
+
+# The SQLite caches and the frontier each share one connection and unlocked
+# bookkeeping across calls, so database work is serialized on a single thread
+_sizes = {"io": IO_THREADS, "db": 1}
+_pools: dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _pool(name: str) -> ThreadPoolExecutor:
+    with _lock:
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(max_workers=_sizes[name], thread_name_prefix=f"replit-finder-{name}")
+        return _pools[name]
+
+
+async def _run(name: str, fn: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(name), functools.partial(fn, *args, **kwargs))
+
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Runs blocking I/O (filesystem walks, sync HTTP libraries) on the I/O thread pool."""
+    return await _run("io", fn, *args, **kwargs)
+
+
+async def run_db(fn: Callable, *args, **kwargs) -> Any:
+    """Runs a blocking SQLite call on the single database thread, so calls never overlap."""
+    return await _run("db", fn, *args, **kwargs)
+
+
+async def run_subprocess(command: list[str], on_line: Callable[[str], None] | None = None, cwd: str | None = None) -> tuple[int, str, str]:
+    """
+    Runs a command as an asyncio subprocess without blocking the event loop.
+    Each stdout line is passed to `on_line` as it arrives (and then not kept);
+    without a callback stdout is collected. Returns (returncode, stdout, stderr).
+    Raises FileNotFoundError if the executable does not exist, like subprocess.run.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=cwd,
+        limit=1024 * 1024,  # scanners emit long JSON lines
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout_lines: list[str] = []
+
+    async def read_stdout():
+        async for raw in process.stdout:
+            line = raw.decode("utf-8", errors="replace").rstrip("\n")
+            if on_line:
+                on_line(line)
+            else:
+                stdout_lines.append(line)
+
+    _, stderr = await asyncio.gather(read_stdout(), process.stderr.read())
+    returncode = await process.wait()
+    return returncode, "\n".join(stdout_lines), stderr.decode("utf-8", errors="replace")
+
+
+def shutdown():
+    """Shuts every pool down; used when the process exits."""
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
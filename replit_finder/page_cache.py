@@ -0,0 +1,219 @@
+# replit_finder/page_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+from .config import PAGE_CACHE_MAX_MB, PAGE_CACHE_TTL
+from .database import DB_PATH
+
+CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "page_cache.db"))
+
+
+@dataclass
+class PageEntry:
+    """What is known about a URL from its last fetch."""
+    url: str
+    content_hash: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    links: set[str]
+    fresh: bool
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class PageCacheStats:
+    hits: int = 0
+    revalidated: int = 0
+    unchanged: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "unchanged": self.unchanged,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+class PageCache:
+    """
+    Content-addressed store for fetched candidate pages. Bodies are kept
+    zlib-compressed under their SHA-256, together with the repo links found in
+    them; per-URL metadata (ETag, Last-Modified, fetch time, content hash)
+    points at a body. Pages sharing content share one body. Entries younger
+    than `ttl` are served without a request; the least recently used URLs are
+    evicted once the bodies exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = PAGE_CACHE_MAX_MB * 1024 * 1024, ttl: int = PAGE_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = PageCacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_blobs (
+                hash TEXT PRIMARY KEY,
+                body BLOB,
+                size INTEGER,
+                links TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_meta (
+                url TEXT PRIMARY KEY,
+                hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_page_meta_last_access ON page_meta (last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_page_meta_hash ON page_meta (hash)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_blobs").fetchone()[0]
+
+    def lookup(self, url: str) -> PageEntry | None:
+        row = self._conn.execute(
+            """
+            SELECT m.hash, m.etag, m.last_modified, m.fetched_at, b.links
+            FROM page_meta m JOIN page_blobs b ON b.hash = m.hash
+            WHERE m.url = ?
+            """,
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        content_hash, etag, last_modified, fetched_at, links = row
+        fresh = time.time() - fetched_at < self.ttl
+        return PageEntry(url, content_hash, etag, last_modified, fetched_at, set(json.loads(links)), fresh)
+
+    def links_for(self, content_hash: str) -> set[str] | None:
+        """Returns the links stored with a body, or None if the body is unknown."""
+        row = self._conn.execute("SELECT links FROM page_blobs WHERE hash = ?", (content_hash,)).fetchone()
+        return set(json.loads(row[0])) if row else None
+
+    def body(self, content_hash: str) -> bytes | None:
+        row = self._conn.execute("SELECT body FROM page_blobs WHERE hash = ?", (content_hash,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def touch(self, url: str, refetched: bool = False):
+        """Marks a URL as used; a revalidated or refetched URL also restarts its TTL."""
+        now = time.time()
+        with self._lock:
+            if refetched:
+                self._conn.execute("UPDATE page_meta SET last_access = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._conn.execute("UPDATE page_meta SET last_access = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+    def store(self, url: str, content_hash: str, body: bytes | None, links: set[str], etag: str | None = None, last_modified: str | None = None):
+        """
+        Records a fetch of `url`. The body is compressed and stored only if no
+        page with the same hash is stored yet. Enforces the size bound.
+        """
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT hash FROM page_meta WHERE url = ?", (url,)).fetchone()
+            known = self._conn.execute("SELECT 1 FROM page_blobs WHERE hash = ?", (content_hash,)).fetchone()
+            if not known:
+                compressed = zlib.compress(body or b"", 6)
+                self._conn.execute(
+                    "INSERT INTO page_blobs (hash, body, size, links) VALUES (?, ?, ?, ?)",
+                    (content_hash, compressed, len(compressed), json.dumps(sorted(links))),
+                )
+                self._total_bytes += len(compressed)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_meta (url, hash, etag, last_modified, fetched_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content_hash, etag, last_modified, now, now),
+            )
+            if previous and previous[0] != content_hash:
+                self._drop_if_orphaned(previous[0])
+            self._conn.commit()
+            self.stats.stores += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def evict(self):
+        """Drops least recently used URLs, and bodies no URL points at, until below 90% of the size bound."""
+        with self._lock:
+            self._evict()
+
+    def _drop_if_orphaned(self, content_hash: str):
+        """Deletes a body no URL points at any more and takes its size off the total."""
+        if self._conn.execute("SELECT 1 FROM page_meta WHERE hash = ?", (content_hash,)).fetchone():
+            return
+        row = self._conn.execute("SELECT size FROM page_blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM page_blobs WHERE hash = ?", (content_hash,))
+            self._total_bytes -= row[0]
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        # Bodies orphaned outside store() (e.g. by an older version) go first
+        self._conn.execute("DELETE FROM page_blobs WHERE hash NOT IN (SELECT hash FROM page_meta)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_blobs").fetchone()[0]
+        sizes = dict(self._conn.execute("SELECT hash, size FROM page_blobs"))
+        refs: dict[str, int] = {}
+        for (content_hash,) in self._conn.execute("SELECT hash FROM page_meta"):
+            refs[content_hash] = refs.get(content_hash, 0) + 1
+        doomed = []
+        for url, content_hash in self._conn.execute("SELECT url, hash FROM page_meta ORDER BY last_access ASC").fetchall():
+            if self._total_bytes <= target:
+                break
+            doomed.append((url,))
+            refs[content_hash] -= 1
+            if refs[content_hash] == 0:
+                self._total_bytes -= sizes.get(content_hash, 0)
+        self._conn.executemany("DELETE FROM page_meta WHERE url = ?", doomed)
+        self._conn.execute("DELETE FROM page_blobs WHERE hash NOT IN (SELECT hash FROM page_meta)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_blobs").fetchone()[0]
+        self._conn.commit()
+        self.stats.evictions += len(doomed)
+
+    def clear(self):
+        """Removes every stored page."""
+        with self._lock:
+            self._conn.execute("DELETE FROM page_meta")
+            self._conn.execute("DELETE FROM page_blobs")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        self._conn.close()
+
+
+_cache: PageCache | None = None
+
+
+def get_cache() -> PageCache:
+    """Returns the process-wide page cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = PageCache()
+    return _cache
+
+
+def page_cache_stats() -> dict:
+    """Returns hit/revalidation/unchanged counters of the page cache for this process."""
+    return get_cache().stats.to_dict()
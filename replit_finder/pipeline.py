@@ -0,0 +1,349 @@
+# replit_finder/pipeline.py
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable
+from urllib.parse import urlparse
+
+import aiohttp
+
+from . import canonical, database, offload, page_cache, scraper, search, search_cache
+from .budget import DorkYield
+from .processed import ProcessedIndex
+from .config import ENRICH_CONCURRENCY, FETCH_CONCURRENCY, GRAPHQL_BATCH_SIZE, PAGE_CACHE_MAX_MB, SEARCH_CACHE_TTL
+from .enrichment import EnrichmentExecutor, prefetch_repo_features
+from .frontier import ENRICHED, FETCHED, PENDING, Frontier
+from .politeness import HostScheduler
+
+# Seconds a partial GraphQL batch may wait for more repos before it is sent anyway
+BATCH_FLUSH_INTERVAL = 2.0
+# Page -> repo links buffered before they are written to the link graph in one transaction
+LINK_FLUSH_SIZE = 500
+
+
+class ReplitPipeline:
+    """
+    Streaming search -> fetch -> extract -> enrich pipeline for Replit dorks.
+
+    Stages are connected by bounded queues: search results feed a candidate
+    queue drained by fetch workers; every page is streamed, size-capped and
+    reduced to its repo links as it arrives; new repos are batched through GraphQL and handed to an
+    EnrichmentExecutor while other pages are still being fetched. Fetch workers
+    pause while the enrichment backlog is full, so memory stays bounded.
+    Every item's state is checkpointed in the run's Frontier, so a run started
+    on a frontier that already has items resumes where it stopped. Frontier and
+    database writes go through the offload database pool, never the event loop.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        process: Callable[[str, set[str], dict | None], Awaitable[dict | None]],
+        frontier: Frontier,
+        max_results: int,
+        concurrency: int = ENRICH_CONCURRENCY,
+        fetch_concurrency: int = FETCH_CONCURRENCY,
+        progress_callback=None,
+        refresh_search: bool = False,
+        incremental: bool = False,
+        query_results: dict[str, int] | None = None,
+        processed: ProcessedIndex | None = None,
+    ):
+        self.session = session
+        self.process = process
+        self.frontier = frontier
+        self.max_results = max_results
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.progress_callback = progress_callback
+        self.candidates: asyncio.Queue = asyncio.Queue(maxsize=self.fetch_concurrency * 2)
+        self.executor = EnrichmentExecutor(self._enrich, concurrency)
+        self.backlog = max(concurrency * 8, GRAPHQL_BATCH_SIZE * 2)
+        # Reverse index repo -> pages linking to it, grown as pages arrive
+        self.repo_pages: dict[str, set[str]] = defaultdict(set)
+        self.prefetched: dict[str, dict] = {}
+        self.page_cache = page_cache.get_cache() if PAGE_CACHE_MAX_MB > 0 else None
+        self.search_cache = search_cache.get_cache() if SEARCH_CACHE_TTL > 0 else None
+        self.refresh_search = refresh_search
+        self.incremental = incremental
+        # Per-query result quotas (see budget.allocate_budget); max_results for the rest
+        self.query_results = query_results
+        self.processed = processed
+        # What each query produced in this run, and which queries every candidate page came from
+        self.yields: dict[str, DorkYield] = defaultdict(DorkYield)
+        self._page_queries: dict[str, set[str]] = defaultdict(set)
+        # When each query was searched in this session; recorded as its last run once the run completes
+        self._searched: dict[str, datetime] = {}
+        self.hosts = HostScheduler(session, global_limit=self.fetch_concurrency)
+        self.counts = {
+            "queries": 0,
+            "queries_done": 0,
+            "candidates": 0,
+            "pages_fetched": 0,
+            "pages_with_repos": 0,
+            "repos": 0,
+            "enriched": 0,
+            "candidates_seen_before": 0,
+        }
+        self._seen_candidates: set[str] = set()
+        self._batch: list[str] = []
+        self._stop_flushing = asyncio.Event()
+        self._submitted: set[str] = set()
+        self._links: list[tuple[str, str]] = []
+        self._fetched_pages: list[str] = []
+
+    def report(self, step: str | None = None):
+        """Sends per-stage counts through the (step, count, total) progress callback."""
+        if not self.progress_callback:
+            return
+        c = self.counts
+        stages = (
+            f"queries {c['queries_done']}/{c['queries']}, "
+            f"pages {c['pages_fetched']}/{c['candidates']}, "
+            f"repos {c['enriched']}/{c['repos']}"
+        )
+        done = c["queries_done"] + c["pages_fetched"] + c["enriched"]
+        total = c["queries"] + c["candidates"] + c["repos"]
+        self.progress_callback(f"{step} ({stages})" if step else stages, done, max(total, 1))
+
+    @staticmethod
+    def _candidate_url(url: str) -> str | None:
+        parsed = urlparse(url)
+        if not (parsed.netloc.endswith("repl.co") or parsed.netloc.endswith("replit.com")):
+            return None
+        return canonical.canonical_page_url(url)
+
+    async def _add_candidate(self, url: str):
+        if url in self._seen_candidates:
+            return
+        self._seen_candidates.add(url)
+        self.counts["candidates"] += 1
+        await offload.run_db(self.frontier.add, "page", [url])
+        await self.candidates.put(url)
+
+    async def _search_stage(self, queries: list[str]):
+        self.counts["queries"] = len(queries)
+        started = datetime.now()
+        windows = None
+        if self.incremental:
+            # Only ask for results newer than each dork's last successful search
+            last_runs = await offload.run_db(database.get_dork_last_runs, queries)
+            windows = {query: search.recency_filter((started - at).total_seconds()) for query, at in last_runs.items()}
+        async for query, urls, error in search.search_queries(
+            self.session, queries, num=self.max_results, cache=self.search_cache, refresh=self.refresh_search,
+            windows=windows, nums=self.query_results,
+        ):
+            if error is not None:
+                print(f"[!] Search failed for {query!r}: {error}")
+                await offload.run_db(self.frontier.fail, "query", query, str(error))
+            else:
+                candidates = [url for url in map(self._candidate_url, urls) if url]
+                if self.incremental:
+                    unseen = await offload.run_db(database.unseen_pages, candidates)
+                    self.counts["candidates_seen_before"] += len(candidates) - len(unseen)
+                    candidates = unseen
+                self.yields[query].runs = 1
+                self.yields[query].candidates += len(set(candidates))
+                await offload.run_db(self.frontier.add_sources, query, candidates)
+                for url in candidates:
+                    self._page_queries[url].add(query)
+                    await self._add_candidate(url)
+                await offload.run_db(self.frontier.mark, "query", query, FETCHED)
+                self._searched[query] = started
+            self.counts["queries_done"] += 1
+            self.report("Searching for candidate URLs")
+        print(f"[+] Collected {len(self._seen_candidates)} unique Replit candidate URLs")
+        if self.incremental:
+            print(f"[+] Skipped {self.counts['candidates_seen_before']} candidate URLs fetched by earlier runs")
+
+    async def _fetch_worker(self):
+        while True:
+            url = await self.candidates.get()
+            if url is None:
+                break
+            await self.executor.wait_below(self.backlog)
+            # Only the link set outlives this call; unchanged pages reuse their stored links
+            repo_links = await scraper.fetch_repo_links(self.session, url, cache=self.page_cache, hosts=self.hosts)
+            if repo_links is not None:
+                repo_links = await self._canonical_repos(repo_links)
+                await offload.run_db(self._checkpoint_page, url, repo_links)
+                self._fetched_pages.append(url)
+            else:
+                await offload.run_db(self.frontier.fail, "page", url, "failed fetch")
+                repo_links = set()
+            self.counts["pages_fetched"] += 1
+            if repo_links:
+                self.counts["pages_with_repos"] += 1
+                for query in self._page_queries.get(url, ()):
+                    self.yields[query].pages_with_repos += 1
+            await self._on_page(url, repo_links)
+            self.report("Fetching pages")
+
+    async def _canonical_repos(self, links: set[str]) -> set[str]:
+        """Collapses link variants to canonical keys, then to the full_name URLs earlier lookups resolved them to."""
+        keys = {key for key in map(canonical.canonical_repo_url, links) if key}
+        if not keys:
+            return set()
+        aliases = await offload.run_db(database.resolve_repo_aliases, keys)
+        return {aliases.get(key, key) for key in keys}
+
+    def _checkpoint_page(self, page_url: str, repo_links: set[str]):
+        self.frontier.mark("page", page_url, FETCHED)
+        self.frontier.add_links(page_url, repo_links)
+
+    async def _on_page(self, page_url: str, repo_links: set[str]):
+        if repo_links:
+            await offload.run_db(self.frontier.add, "repo", repo_links)
+        for repo_url in repo_links:
+            pages = self.repo_pages[repo_url]
+            pages.add(page_url)
+            self._links.append((page_url, repo_url))
+            if len(pages) == 1:
+                self.counts["repos"] += 1
+                self._batch.append(repo_url)
+            elif repo_url in self._submitted:
+                # Linked from another page: move it up if it has not started yet
+                self.executor.submit(repo_url, len(pages))
+        if len(self._links) >= LINK_FLUSH_SIZE or len(self._fetched_pages) >= LINK_FLUSH_SIZE:
+            await self._flush_links()
+        if len(self._batch) >= GRAPHQL_BATCH_SIZE:
+            await self._flush_batch()
+
+    async def _flush_links(self):
+        links, self._links = self._links, []
+        if links:
+            await offload.run_db(database.insert_page_links, links)
+        fetched, self._fetched_pages = self._fetched_pages, []
+        if fetched:
+            await offload.run_db(database.mark_pages_seen, fetched)
+
+    async def _flush_batch(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        try:
+            self.prefetched.update(await prefetch_repo_features(self.session, batch, self.processed))
+        except BaseException:
+            # Put the repos back so a later flush still submits them
+            self._batch[:0] = batch
+            raise
+        for repo_url in batch:
+            self._submitted.add(repo_url)
+            self.executor.submit(repo_url, len(self.repo_pages[repo_url]))
+
+    async def _flush_periodically(self):
+        """Flushes partial batches every BATCH_FLUSH_INTERVAL until _stop_flushing is set; never stops mid-flush."""
+        while not self._stop_flushing.is_set():
+            try:
+                await asyncio.wait_for(self._stop_flushing.wait(), BATCH_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                await self._flush_batch()
+
+    async def _enrich(self, repo_url: str) -> dict | None:
+        try:
+            result = await self.process(repo_url, self.repo_pages[repo_url], self.prefetched.pop(repo_url, None))
+        except Exception as e:
+            # Stays pending for --resume until it runs out of retries
+            await offload.run_db(self.frontier.fail, "repo", repo_url, str(e))
+            raise
+        # process returns once the repo's row is stored (a failed write raises above),
+        # or None for deliberate skips, which are done for good
+        await offload.run_db(self._mark_enriched, repo_url, result)
+        return result
+
+    def _mark_enriched(self, repo_url: str, result: dict | None):
+        """
+        Marks a repo enriched and credits its queries in one call on the database
+        thread. Cancelling the await either stops the call before it starts or
+        lets it finish, so the mark and the credit are never separated; the yields
+        are recorded by a later call on the same thread, after this one.
+        """
+        self.frontier.mark("repo", repo_url, ENRICHED)
+        if result:
+            self._credit_queries(repo_url, result)
+
+    def _record_searches(self):
+        """Records the search time of every query this run searched, in this or an earlier session."""
+        runs = {**self.frontier.updated_at("query", FETCHED), **self._searched}
+        if runs:
+            database.mark_dork_runs(runs)
+
+    def _credit_queries(self, repo_url: str, result: dict):
+        """Counts a newly processed repo for every query whose pages link to it."""
+        queries = set()
+        for page_url in self.repo_pages[repo_url]:
+            queries |= self._page_queries.get(page_url, set())
+        for query in queries:
+            self.yields[query].new_repos += 1
+            if result.get("category") == "production":
+                self.yields[query].production_repos += 1
+
+    def _restore(self) -> list[str]:
+        """Reloads links and item states from the frontier; returns the pages still to fetch."""
+        links = self.frontier.links()
+        for page_url, repo_url in links:
+            self.repo_pages[repo_url].add(page_url)
+        for page_url, query in self.frontier.sources():
+            self._page_queries[page_url].add(query)
+        # A run killed between saving a page's links and its repos must not lose them
+        self.frontier.add("repo", {repo_url for _, repo_url in links})
+        self._seen_candidates.update(self.frontier.items("page"))
+        pending_pages = self.frontier.items("page", PENDING)
+        self.counts["candidates"] = len(self._seen_candidates)
+        self.counts["pages_fetched"] = len(self._seen_candidates) - len(pending_pages)
+        self.counts["repos"] = len(self.frontier.items("repo"))
+        pending_repos = self.frontier.items("repo", PENDING)
+        self.counts["enriched"] = self.counts["repos"] - len(pending_repos)
+        self._batch.extend(pending_repos)
+        if self.counts["candidates"]:
+            print(f"[+] Resuming run {self.frontier.run_id}: {len(pending_pages)} pages and {len(pending_repos)} repos pending")
+        return pending_pages
+
+    async def _produce(self, queries: list[str]):
+        pending_pages = await offload.run_db(self._restore)
+        fetchers = [asyncio.create_task(self._fetch_worker()) for _ in range(self.fetch_concurrency)]
+        flusher = asyncio.create_task(self._flush_periodically())
+        try:
+            for url in pending_pages:
+                await self.candidates.put(url)
+            await self._search_stage(queries)
+            for _ in fetchers:
+                await self.candidates.put(None)
+            await asyncio.gather(*fetchers)
+            # Let a flush in progress finish instead of dropping its batch
+            self._stop_flushing.set()
+            await flusher
+            await self._flush_links()
+            await self._flush_batch()
+            print(f"[+] Found {self.counts['repos']} unique repos referenced from candidate pages")
+        finally:
+            flusher.cancel()
+            for task in fetchers:
+                task.cancel()
+            self.executor.close()
+            await self._flush_links()
+
+    async def run(self, queries: list[str]) -> AsyncIterator[dict]:
+        """
+        Runs all stages and yields enriched repos as they complete.
+        Only `queries` still pending in the frontier are searched.
+        """
+        await offload.run_db(self.frontier.add, "query", queries)
+        pending = set(await offload.run_db(self.frontier.items, "query", PENDING))
+        queries = [q for q in queries if q in pending]
+        producer = asyncio.create_task(self._produce(queries))
+        try:
+            async for repo_url, result in self.executor.results():
+                self.counts["enriched"] += 1
+                self.report("Processing repositories")
+                if result:
+                    yield result
+            await producer
+            # Every page of the searched queries is processed only now; recorded earlier, an
+            # interrupted run would make the next incremental run skip the results it never fetched
+            await offload.run_db(self._record_searches)
+        finally:
+            producer.cancel()
+            await self.executor.cancel()
+            # Interrupted runs are credited too; a resumed run adds only what it did after resuming
+            if self.yields:
+                await offload.run_db(database.record_dork_yields, {query: y.to_dict() for query, y in self.yields.items()})
@@ -0,0 +1,196 @@
+# replit_finder/politeness.py
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from .config import (
+    FETCH_CONCURRENCY,
+    HOST_CONCURRENCY,
+    HOST_MAX_RETRIES,
+    HOST_MIN_DELAY,
+    RESPECT_ROBOTS,
+    USER_AGENT,
+)
+
+T = TypeVar("T")
+
+# Statuses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = {429, 503}
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 120.0
+# Upper bound for the adaptive per-host delay
+MAX_DELAY = 30.0
+ROBOTS_TTL = 24 * 60 * 60
+
+# robots.txt parsers per origin, shared by every scheduler in the process
+_robots: dict[str, tuple[RobotFileParser, float]] = {}
+
+
+@dataclass
+class HostState:
+    """Politeness state and counters of one host."""
+    semaphore: asyncio.Semaphore
+    delay: float
+    next_request_at: float = 0.0
+    requests: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    throttled: int = 0
+    robots_blocked: int = 0
+    total_seconds: float = 0.0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "throttled": self.throttled,
+            "robots_blocked": self.robots_blocked,
+            "avg_seconds": round(self.total_seconds / self.requests, 3) if self.requests else 0.0,
+            "delay": round(self.delay, 3),
+            "statuses": dict(self.statuses),
+        }
+
+
+def _retry_after(headers) -> float | None:
+    value = headers.get("Retry-After") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostScheduler:
+    """
+    Host-aware scheduler for candidate page fetches. Each host gets at most
+    `per_host` requests in flight and at least `min_delay` seconds between
+    request starts, under a global cap of `global_limit`. A 429/503 answer
+    backs the host off (Retry-After when given, else exponential) and widens
+    its delay; successes narrow it back towards `min_delay`. robots.txt is
+    fetched once per origin and cached for ROBOTS_TTL.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        per_host: int = HOST_CONCURRENCY,
+        global_limit: int = FETCH_CONCURRENCY,
+        min_delay: float = HOST_MIN_DELAY,
+        max_retries: int = HOST_MAX_RETRIES,
+        respect_robots: bool = RESPECT_ROBOTS,
+    ):
+        self.session = session
+        self.per_host = max(1, per_host)
+        self.min_delay = min_delay
+        self.max_retries = max_retries
+        self.respect_robots = respect_robots
+        self._global = asyncio.Semaphore(max(1, global_limit))
+        self._hosts: dict[str, HostState] = {}
+        self._robots_locks: dict[str, asyncio.Lock] = {}
+
+    def _host(self, host: str) -> HostState:
+        if host not in self._hosts:
+            self._hosts[host] = HostState(asyncio.Semaphore(self.per_host), self.min_delay)
+        return self._hosts[host]
+
+    async def allowed(self, url: str) -> bool:
+        """Checks the URL against its origin's robots.txt (fetched at most once per ROBOTS_TTL)."""
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        cached = _robots.get(origin)
+        if cached is None or time.time() - cached[1] > ROBOTS_TTL:
+            lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+            async with lock:
+                cached = _robots.get(origin)
+                if cached is None or time.time() - cached[1] > ROBOTS_TTL:
+                    cached = (await self._fetch_robots(origin), time.time())
+                    _robots[origin] = cached
+        if cached[0].can_fetch(USER_AGENT, url):
+            return True
+        self._host(parsed.netloc).robots_blocked += 1
+        return False
+
+    async def _fetch_robots(self, origin: str) -> RobotFileParser:
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            async with self._slot(urlparse(origin).netloc):
+                async with self.session.get(parser.url, headers={"User-Agent": USER_AGENT}, timeout=10) as response:
+                    if response.status in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status >= 400:
+                        parser.allow_all = True
+                    else:
+                        parser.parse((await response.text(errors="replace")).splitlines())
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # An unreachable robots.txt does not block the site
+            parser.allow_all = True
+        return parser
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, host: str):
+        state = self._host(host)
+        async with state.semaphore:
+            wait = state.next_request_at - time.monotonic()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = state.next_request_at - time.monotonic()
+            # Taken only once the host is ready, so a backed-off host never holds a global slot
+            async with self._global:
+                state.next_request_at = time.monotonic() + state.delay
+                yield state
+
+    async def run(self, url: str, fetch: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `fetch` for `url` under the host's limits. Throttling answers
+        (aiohttp.ClientResponseError with 429/503) are retried up to
+        `max_retries` times after backing off; other errors are re-raised.
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            async with self._slot(host) as state:
+                state.requests += 1
+                started = time.monotonic()
+                try:
+                    result = await fetch()
+                except aiohttp.ClientResponseError as e:
+                    state.total_seconds += time.monotonic() - started
+                    state.statuses[e.status] = state.statuses.get(e.status, 0) + 1
+                    if e.status not in THROTTLE_STATUSES or attempt >= self.max_retries:
+                        state.failed += 1
+                        raise
+                    state.throttled += 1
+                    backoff = _retry_after(e.headers) or BACKOFF_BASE * 2 ** attempt
+                    state.delay = min(MAX_DELAY, max(state.delay * 2, self.min_delay or BACKOFF_BASE))
+                    state.next_request_at = max(state.next_request_at, time.monotonic() + min(backoff, BACKOFF_MAX))
+                    attempt += 1
+                    continue
+                except Exception:
+                    state.total_seconds += time.monotonic() - started
+                    state.failed += 1
+                    raise
+                state.total_seconds += time.monotonic() - started
+                state.succeeded += 1
+                state.delay = max(self.min_delay, state.delay * 0.9)
+                return result
+
+    def stats(self, top: int | None = None) -> dict[str, dict]:
+        """Per-host counters, busiest hosts first."""
+        hosts = sorted(self._hosts.items(), key=lambda item: item[1].requests, reverse=True)
+        return {host: state.to_dict() for host, state in hosts[:top]}
@@ -0,0 +1,112 @@
+# replit_finder/processed.py
+import hashlib
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from . import database
+from .config import (
+    PROCESSED_BLOOM_FP_RATE,
+    PROCESSED_BLOOM_MIN_ROWS,
+    REFRESH_MAX_AGE_DAYS,
+    REFRESH_NEAR_THRESHOLD_DAYS,
+    REFRESH_SCORE_MARGIN,
+)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (blake2b, double hashing)."""
+
+    def __init__(self, capacity: int, fp_rate: float = PROCESSED_BLOOM_FP_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+@dataclass
+class ProcessedStats:
+    stored: int = 0
+    fresh: int = 0
+    stale: int = 0
+    bloom: bool = False
+    nbytes: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "stored": self.stored,
+            "fresh": self.fresh,
+            "stale": self.stale,
+            "bloom": self.bloom,
+            "nbytes": self.nbytes,
+        }
+
+
+class ProcessedIndex:
+    """
+    In-memory set of repositories that were processed recently enough to be
+    skipped, loaded from the database once per run. A repo is stale (and
+    re-enriched) once it is older than `max_age_days`, or, if its score is
+    within `score_margin` of `min_score`, older than `near_threshold_days`;
+    a zero disables either rule. Databases with at least `bloom_min_rows`
+    repositories are held in a Bloom filter instead of a set, so a fresh
+    repo is never re-enriched and a stale one is skipped with probability
+    PROCESSED_BLOOM_FP_RATE.
+    """
+
+    def __init__(self, expected: int = 0, bloom_min_rows: int = PROCESSED_BLOOM_MIN_ROWS):
+        self.stats = ProcessedStats()
+        if expected >= bloom_min_rows:
+            # Room for the repos this run adds as well
+            self._urls = BloomFilter(int(expected * 1.1) + 1000)
+            self.stats.bloom = True
+            self.stats.nbytes = self._urls.nbytes()
+        else:
+            self._urls = set()
+
+    @classmethod
+    def load(
+        cls,
+        min_score: int,
+        max_age_days: float = REFRESH_MAX_AGE_DAYS,
+        score_margin: int = REFRESH_SCORE_MARGIN,
+        near_threshold_days: float = REFRESH_NEAR_THRESHOLD_DAYS,
+    ) -> "ProcessedIndex":
+        """Streams every stored repository's last_processed and score, keeping the fresh ones."""
+        index = cls(database.count_repositories())
+        now = datetime.now()
+        # last_processed is stored as ISO text, so cutoffs compare as strings
+        cutoff = str(now - timedelta(days=max_age_days)) if max_age_days > 0 else None
+        near_cutoff = str(now - timedelta(days=near_threshold_days)) if score_margin > 0 else None
+        for repo_url, last_processed, score in database.iter_processed_repositories():
+            index.stats.stored += 1
+            last_processed = str(last_processed or "")
+            if (cutoff and last_processed < cutoff) or (
+                near_cutoff and score is not None and abs(score - min_score) <= score_margin and last_processed < near_cutoff
+            ):
+                index.stats.stale += 1
+            else:
+                index.stats.fresh += 1
+                index._urls.add(repo_url)
+        return index
+
+    def is_fresh(self, repo_url: str) -> bool:
+        return repo_url in self._urls
+
+    def add(self, repo_url: str):
+        self._urls.add(repo_url)
@@ -0,0 +1,168 @@
+# replit_finder/ratelimit.py
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+from multidict import CIMultiDict
+
+from .config import GITHUB_MAX_PARK_SECONDS, GITHUB_TOKENS
+
+# Budgets GitHub grants per token and resource before the first response tells us otherwise
+DEFAULT_LIMITS = {"core": 5000, "search": 30, "graphql": 5000}
+ANONYMOUS_LIMITS = {"core": 60, "search": 10, "graphql": 0}
+# Secondary limits without Retry-After: GitHub asks for at least a minute; the
+# wait doubles each time the same token trips again, up to 2**SECONDARY_MAX_DOUBLINGS
+SECONDARY_LIMIT_WAIT = 60.0
+SECONDARY_MAX_DOUBLINGS = 4
+# Body fragments of 403s that are secondary rate limits rather than permission errors
+SECONDARY_LIMIT_MARKERS = (b"secondary rate limit", b"abuse detection")
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when no token regains budget within the allowed parking time.
+    Deliberately not an aiohttp.ClientError, so callers that turn request errors
+    into zero values cannot mistake an exhausted budget for a real result.
+    """
+    def __init__(self, resource: str, wait: float):
+        super().__init__(f"GitHub {resource} budget exhausted; next reset in {wait:.0f}s")
+        self.resource = resource
+        self.wait = wait
+
+
+@dataclass
+class TokenBudget:
+    """Live budget of one token for one rate-limit resource."""
+    token: str | None
+    resource: str
+    limit: int
+    remaining: int
+    reset_at: float = 0.0
+    blocked_until: float = 0.0
+    in_flight: int = 0
+    # Consecutive secondary-limit rejections, for the backoff
+    strikes: int = 0
+
+    def available(self, now: float) -> int:
+        if now < self.blocked_until:
+            return 0
+        if self.reset_at and now >= self.reset_at:
+            # Window rolled over: the bucket is full again until headers say otherwise
+            self.remaining = self.limit
+            self.reset_at = 0.0
+        return self.remaining - self.in_flight
+
+    def ready_at(self, now: float) -> float:
+        return max(self.blocked_until, self.reset_at or now)
+
+
+class RateLimitScheduler:
+    """
+    Hands out GitHub tokens per request, always picking the token with the most
+    budget left, and parks callers until a reset when every token is drained.
+    Budgets are refilled from X-RateLimit-* and Retry-After response headers.
+    State is guarded by a thread lock so searches running on separate event
+    loops (one per Flask worker thread) share the same view of the budget.
+    """
+
+    def __init__(self, tokens: list[str] | None = None, max_park: float = GITHUB_MAX_PARK_SECONDS):
+        tokens = list(tokens) if tokens else [None]
+        self.max_park = max_park
+        self._lock = threading.Lock()
+        self._budgets: dict[str, list[TokenBudget]] = {}
+        for resource in DEFAULT_LIMITS:
+            limits = DEFAULT_LIMITS if tokens[0] else ANONYMOUS_LIMITS
+            self._budgets[resource] = [
+                TokenBudget(token, resource, limits[resource], limits[resource]) for token in tokens
+            ]
+
+    def _pick(self, resource: str) -> tuple[TokenBudget | None, float]:
+        """Reserves the best token, or returns the number of seconds until one frees up."""
+        now = time.time()
+        with self._lock:
+            budgets = self._budgets[resource]
+            if all(b.limit == 0 for b in budgets):
+                return None, float("inf")
+            best = max(budgets, key=lambda b: b.available(now))
+            if best.available(now) > 0:
+                best.in_flight += 1
+                return best, 0.0
+            waits = [b.ready_at(now) - now for b in budgets if b.in_flight == 0 or now < b.blocked_until]
+            # Tokens with requests in flight may be refilled by their responses; poll shortly
+            wait = min(waits) if waits else 1.0
+            return None, max(wait, 0.5)
+
+    async def acquire(self, resource: str) -> TokenBudget:
+        """Waits for and reserves a token with budget left for `resource`."""
+        parked = 0.0
+        while True:
+            budget, wait = self._pick(resource)
+            if budget is not None:
+                return budget
+            if parked + wait > self.max_park:
+                raise RateLimitExceeded(resource, wait)
+            if parked == 0.0:
+                print(f"[~] GitHub {resource} budget exhausted; parking requests for up to {wait:.0f}s")
+            step = min(wait, 5.0)
+            await asyncio.sleep(step)
+            parked += step
+
+    def release(self, budget: TokenBudget, status: int | None, headers: CIMultiDict | None, body: bytes | None = None) -> bool:
+        """
+        Returns a reserved token and feeds the response headers back into its budget.
+        Returns True when the response was a rate-limit rejection that should be retried.
+        `body` lets a 403 secondary limit without Retry-After be told from a permission error.
+        """
+        now = time.time()
+        with self._lock:
+            budget.in_flight -= 1
+            if headers is None:
+                return False
+            if (limit := headers.get("X-RateLimit-Limit")) is not None:
+                budget.limit = int(limit)
+            if (remaining := headers.get("X-RateLimit-Remaining")) is not None:
+                budget.remaining = int(remaining)
+            if (reset := headers.get("X-RateLimit-Reset")) is not None:
+                budget.reset_at = float(reset)
+            secondary = status == 429 or (
+                status == 403 and any(marker in (body or b"").lower() for marker in SECONDARY_LIMIT_MARKERS)
+            )
+            limited = secondary or (status == 403 and (budget.remaining == 0 or "Retry-After" in headers))
+            if not limited:
+                budget.strikes = 0
+            elif (retry_after := headers.get("Retry-After")) is not None:
+                budget.blocked_until = now + float(retry_after)
+            elif secondary or not budget.reset_at:
+                budget.blocked_until = now + SECONDARY_LIMIT_WAIT * 2 ** min(budget.strikes, SECONDARY_MAX_DOUBLINGS)
+                budget.strikes += 1
+            return limited
+
+    def snapshot(self) -> dict[str, list[dict]]:
+        """Returns the live budget of every token, with tokens masked."""
+        now = time.time()
+        with self._lock:
+            return {
+                resource: [
+                    {
+                        "token": f"...{b.token[-4:]}" if b.token else None,
+                        "limit": b.limit,
+                        "remaining": max(b.available(now) + b.in_flight, 0),
+                        "in_flight": b.in_flight,
+                        "reset_in": max(int(b.ready_at(now) - now), 0),
+                    }
+                    for b in budgets
+                ]
+                for resource, budgets in self._budgets.items()
+            }
+
+
+_scheduler: RateLimitScheduler | None = None
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Returns the process-wide scheduler for the configured token pool."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RateLimitScheduler(GITHUB_TOKENS)
+    return _scheduler
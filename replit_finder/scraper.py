@@ -1,44 +1,221 @@
 # replit_finder/scraper.py
 import re
+import codecs
+import asyncio
+import hashlib
+import contextlib
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator
 import aiohttp
-from bs4 import BeautifulSoup
-from .config import USER_AGENT
+from . import offload
+from .config import FETCH_MAX_BYTES, USER_AGENT
+from .page_cache import PageCache, PageEntry
+from .politeness import HostScheduler
 
-GITHUB_REPO_REGEX = re.compile(r"https?://github\.com/([A-Za-z0-9_.-]+)/([A-Za-z0-9_.-]+)(?:/|$)")
-GITLAB_REPO_REGEX = re.compile(r"https?://gitlab\.com/([A-Za-z0-9_.-]+)/([A-Za-z0-9_.-]+)(?:/|$)")
+# Separators as they appear in raw HTML: plain, JSON-escaped or entity-encoded
+_SLASH = r"(?:/|\\/|&#[xX]0*2[fF];|&#0*47;|&sol;)"
+_DOT = r"(?:\.|&#[xX]0*2[eE];|&#0*46;|&period;)"
+_SLUG = r"([A-Za-z0-9_.-]+)"
+# One pass for GitHub and GitLab links in any form: absolute, protocol-relative
+# (//github.com/...), scheme-less, JSON-escaped and entity-encoded. The host may
+# not be preceded by a hostname character other than "www.", nor by a single
+# path slash, so api.github.com, notgithub.com or example.com/github.com/...
+# never match. The pattern starts with the literal "it" so the regex engine can
+# use its fast literal search; the "G" is checked by the lookbehinds.
+REPO_LINK_REGEX = re.compile(
+    r"it(?<=[Gg]it)(?<![^/\\]/[Gg]it)(?:(?<![A-Za-z0-9_.-][Gg]it)|(?<=[Ww][Ww][Ww]\.[Gg]it))([Hh]ub|[Ll]ab)"
+    rf"{_DOT}[Cc][Oo][Mm]{_SLASH}{_SLUG}{_SLASH}{_SLUG}"
+)
 
-async def fetch_html(session: aiohttp.ClientSession, url: str, timeout: int = 12) -> str:
+# Media types worth scanning for links; anything else is skipped unread
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml", "text/plain", ""}
+CHUNK_SIZE = 64 * 1024
+# Characters kept between chunks so a link split across a chunk boundary is still found
+LINK_SCAN_MARGIN = 512
+
+@dataclass
+class FetchStats:
+    pages: int = 0
+    bytes_read: int = 0
+    bytes_saved: int = 0
+    skipped_content_type: int = 0
+    truncated: int = 0
+    stopped_early: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+_stats = FetchStats()
+
+def fetch_stats() -> dict:
     """
-    Fetches the HTML content of a given URL asynchronously.
+    Returns page fetch counters for this process: bytes read, and bytes saved by
+    skipping non-HTML responses, capping page size and stopping early.
     """
+    return _stats.to_dict()
+
+def _decoder(charset: str | None) -> codecs.IncrementalDecoder:
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+async def _iter_body(response: aiohttp.ClientResponse, max_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Streams at most `max_bytes` of a response body. Non-HTML responses yield
+    nothing. Closing the iterator early stops the download.
+    """
+    _stats.pages += 1
+    length = response.content_length
+    media_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if media_type not in HTML_CONTENT_TYPES:
+        _stats.skipped_content_type += 1
+        _stats.bytes_saved += length or 0
+        return
+    read = 0
+    done = False
+    try:
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            chunk = chunk[:max_bytes - read]
+            read += len(chunk)
+            if read >= max_bytes:
+                _stats.truncated += 1
+                done = True
+            yield chunk
+            if done:
+                break
+        done = True
+    finally:
+        _stats.bytes_read += read
+        if length and length > read:
+            _stats.bytes_saved += length - read
+        if not done:
+            # The caller closed the stream before the page or the byte cap ran out
+            _stats.stopped_early += 1
+
+async def _iter_text(session: aiohttp.ClientSession, url: str, timeout: int, max_bytes: int) -> AsyncIterator[str]:
+    """Streams a page as decoded text chunks (see _iter_body)."""
     headers = {"User-Agent": USER_AGENT}
+    async with session.get(url, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        decoder = _decoder(response.charset)
+        async with contextlib.aclosing(_iter_body(response, max_bytes)) as body:
+            async for chunk in body:
+                yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+async def fetch_repo_links(
+    session: aiohttp.ClientSession,
+    url: str,
+    timeout: int = 12,
+    max_bytes: int = FETCH_MAX_BYTES,
+    cache: PageCache | None = None,
+    hosts: HostScheduler | None = None,
+) -> set[str] | None:
+    """
+    Streams a page and scans each chunk for repo links as it arrives, so the
+    page is never held in memory whole. Stops after `max_bytes`. Returns None
+    if the fetch failed; a non-HTML response returns an empty set.
+    With a `cache` the page goes through the page cache instead (see
+    _fetch_repo_links_cached), which keeps the capped body to store it.
+    With `hosts` the request runs under its per-host limits, backoff and
+    robots.txt rules; a disallowed page returns an empty set.
+    """
+    entry = None
+    if cache is not None:
+        entry = await offload.run_db(cache.lookup, url)
+        if entry and entry.fresh:
+            cache.stats.hits += 1
+            await offload.run_db(cache.touch, url)
+            return entry.links
+    if hosts is not None and not await hosts.allowed(url):
+        print(f"[-] robots.txt disallows {url}")
+        return set()
+
+    async def fetch() -> set[str]:
+        if cache is not None:
+            return await _fetch_repo_links_cached(session, url, cache, entry, timeout, max_bytes)
+        return await _stream_repo_links(session, url, timeout, max_bytes)
+
     try:
-        async with session.get(url, headers=headers, timeout=timeout) as response:
-            response.raise_for_status()
-            return await response.text()
-    except aiohttp.ClientError as e:
+        return await (hosts.run(url, fetch) if hosts is not None else fetch())
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"[!] Failed to fetch {url}: {e}")
-        return ""
+        return None
+
+async def _stream_repo_links(session: aiohttp.ClientSession, url: str, timeout: int, max_bytes: int) -> set[str]:
+    found: set[str] = set()
+    tail = ""
+    async with contextlib.aclosing(_iter_text(session, url, timeout, max_bytes)) as chunks:
+        async for text in chunks:
+            text = tail + text
+            # Links ending inside the margin may continue in the next chunk; they are rescanned with it
+            cutoff = len(text) - LINK_SCAN_MARGIN
+            found.update(_scan(text, cutoff))
+            tail = text[-2 * LINK_SCAN_MARGIN:]
+    found.update(_scan(tail))
+    return found
+
+async def _fetch_repo_links_cached(
+    session: aiohttp.ClientSession,
+    url: str,
+    cache: PageCache,
+    entry: PageEntry | None,
+    timeout: int,
+    max_bytes: int,
+) -> set[str]:
+    """
+    Fetches a page's repo links through the page cache: a stale `entry` is
+    revalidated with its ETag/Last-Modified, and a body whose hash is already
+    stored reuses that body's link set instead of being scanned again.
+    The body (capped at `max_bytes`) is buffered because the cache stores it;
+    it is only scanned when its hash is new.
+    """
+    headers = {"User-Agent": USER_AGENT, **(entry.validators() if entry else {})}
+    digest = hashlib.sha256()
+    chunks: list[bytes] = []
+    async with session.get(url, headers=headers, timeout=timeout) as response:
+        if response.status == 304 and entry:
+            cache.stats.revalidated += 1
+            await offload.run_db(cache.touch, url, refetched=True)
+            return entry.links
+        response.raise_for_status()
+        charset = response.charset
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        async with contextlib.aclosing(_iter_body(response, max_bytes)) as body:
+            async for chunk in body:
+                digest.update(chunk)
+                chunks.append(chunk)
+    content = b"".join(chunks)
+    content_hash = digest.hexdigest()
+    links = await offload.run_db(cache.links_for, content_hash)
+    if links is not None:
+        cache.stats.unchanged += 1
+    else:
+        cache.stats.misses += 1
+        text = _decoder(charset).decode(content, final=True)
+        # Bodies are capped at max_bytes, which one scan covers in a few milliseconds
+        links = extract_repo_links(text)
+    await offload.run_db(cache.store, url, content_hash, content, links, etag, last_modified)
+    return links
 
 def extract_repo_links(html: str) -> set[str]:
     """
-    Extracts GitHub and GitLab repository links from HTML content.
+    Extracts GitHub and GitLab repository links from HTML content in a single
+    regex scan, returned as https://<host>.com/<owner>/<repo>.
     (This function is CPU-bound and does not need to be async)
     """
+    return _scan(html)
+
+def _scan(text: str, cutoff: int | None = None) -> set[str]:
     found = set()
-    for match in GITHUB_REPO_REGEX.finditer(html):
-        owner, repo = match.group(1), match.group(2)
-        found.add(f"https://github.com/{owner}/{repo}")
-    for match in GITLAB_REPO_REGEX.finditer(html):
-        owner, repo = match.group(1), match.group(2)
-        found.add(f"https://gitlab.com/{owner}/{repo}")
-
-    # Also inspect anchor tags for full links
-    soup = BeautifulSoup(html, "html.parser")
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if href.startswith("https://github.com/"):
-            match = GITHUB_REPO_REGEX.match(href)
-            if match:
-                found.add(match.group(0))
-    return found
\ No newline at end of file
+    for match in REPO_LINK_REGEX.finditer(text):
+        if cutoff is not None and match.end() > cutoff:
+            continue
+        host, owner, repo = match.groups()
+        host = "git" + host.lower()
+        # A sentence ending right after a link ("see github.com/o/r.") is not part of the name
+        repo = repo.rstrip(".")
+        if repo:
+            found.add(f"https://{host}.com/{owner}/{repo}")
+    return found
@@ -1,48 +1,192 @@
 # replit_finder/search.py
-import os
+import asyncio
+import math
+import threading
+import time
+from typing import AsyncIterator
 import aiohttp
-from .config import SERPAPI_API_KEY
+from . import canonical, offload
+from .search_cache import SearchCache
+from .config import GOOGLE_SEARCH_PAUSE, SEARCH_CONCURRENCY, SERPAPI_API_KEY, SERPAPI_PAGE_SIZE
 
 try:
     from googlesearch import search as google_search
 except ImportError:
     google_search = None
 
-async def serpapi_search(session: aiohttp.ClientSession, query: str, num: int = 20) -> list[str]:
+# Pages requested from SerpAPI for one query, whatever `num` asks for
+SERPAPI_MAX_PAGES = 10
+
+# Extra time added to an incremental search window, so results indexed late are not missed
+RECENCY_SLACK_SECONDS = 6 * 60 * 60
+
+# googlesearch scrapes Google directly; calls from every thread share one slot and its spacing
+_google_lock = threading.Lock()
+_google_next_call = 0.0
+
+def recency_filter(seconds: float) -> str:
+    """
+    Builds a Google `tbs` date restriction covering the last `seconds` (plus
+    RECENCY_SLACK_SECONDS): qdr:h<n> below two days, qdr:d<n> above.
+    """
+    hours = math.ceil((seconds + RECENCY_SLACK_SECONDS) / 3600)
+    return f"qdr:h{hours}" if hours < 48 else f"qdr:d{math.ceil(hours / 24)}"
+
+def _cache_query(query: str, tbs: str | None) -> str:
+    return f"{query} [tbs={tbs}]" if tbs else query
+
+async def serpapi_page(session: aiohttp.ClientSession, query: str, start: int = 0, num: int = SERPAPI_PAGE_SIZE, tbs: str | None = None) -> tuple[list[str], bool]:
     """
-    Performs a Google search using the SerpAPI asynchronously.
+    Fetches one page of Google results through SerpAPI, starting at result
+    `start`, optionally restricted by a `tbs` date filter (see recency_filter).
+    Returns the result links and whether SerpAPI has a next page.
     """
     if not SERPAPI_API_KEY:
         raise RuntimeError("SERPAPI_API_KEY not set in environment variables")
     url = "https://serpapi.com/search.json"
-    params = {"engine": "google", "q": query, "num": num, "api_key": SERPAPI_API_KEY}
+    params = {"engine": "google", "q": query, "num": num, "start": start, "api_key": SERPAPI_API_KEY}
+    if tbs:
+        params["tbs"] = tbs
     async with session.get(url, params=params, timeout=20) as response:
         response.raise_for_status()
         data = await response.json()
-        return [result.get("link") or result.get("url") for result in data.get("organic_results", []) if result.get("link") or result.get("url")]
+    links = [result.get("link") or result.get("url") for result in data.get("organic_results", []) if result.get("link") or result.get("url")]
+    return links, bool(data.get("serpapi_pagination", {}).get("next"))
+
+async def serpapi_search(
+    session: aiohttp.ClientSession,
+    query: str,
+    num: int = 20,
+    cache: SearchCache | None = None,
+    refresh: bool = False,
+    tbs: str | None = None,
+) -> list[str]:
+    """
+    Performs a Google search using the SerpAPI asynchronously, paging with
+    `start` until `num` distinct results were collected or the results run out.
+    Results repeated across pages are dropped by merge_results.
+    With a `cache`, pages fetched within its TTL are reused unless `refresh`.
+    """
+    results: list[str] = []
+    start = 0
+    key = _cache_query(query, tbs)
+    for page in range(SERPAPI_MAX_PAGES):
+        page_num = min(SERPAPI_PAGE_SIZE, num - len(results))
+        cached = await offload.run_db(cache.get, "serpapi", key, page, page_num, refresh) if cache is not None else None
+        if cached is not None:
+            links, has_next = cached
+        else:
+            links, has_next = await serpapi_page(session, query, start=start, num=page_num, tbs=tbs)
+            if cache is not None:
+                await offload.run_db(cache.put, "serpapi", key, page, page_num, links, has_next)
+        # `start` counts results Google returned, duplicates included
+        start += len(links)
+        results = merge_results(results, links)
+        if not links or not has_next or len(results) >= num:
+            break
+    return results[:num]
 
-def google_search_fallback(query: str, num: int = 20) -> list[str]:
+def google_search_fallback(query: str, num: int = 20, tbs: str | None = None) -> list[str]:
     """
     Performs a Google search using the googlesearch-python library.
-    This remains synchronous as the library does not support asyncio.
+    This remains synchronous as the library does not support asyncio; callers
+    run it on the I/O pool. Calls are serialized and spaced GOOGLE_SEARCH_PAUSE
+    seconds apart so parallel queries do not get the scraper blocked.
     """
+    global _google_next_call
     if google_search is None:
         raise RuntimeError("googlesearch not installed and no SerpAPI key provided. Please run 'pip install googlesearch-python'")
-    # The googlesearch library is synchronous, so we run it in a thread pool
-    # to avoid blocking the event loop. However, for simplicity here, we'll call it directly.
-    # For a truly non-blocking app, you'd use loop.run_in_executor.
-    return list(google_search(query, num=num, stop=num, pause=2.0))
+    with _google_lock:
+        wait = _google_next_call - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            extra = {"tbs": tbs} if tbs else {}
+            return list(google_search(query, num=num, stop=num, pause=GOOGLE_SEARCH_PAUSE, **extra))
+        finally:
+            _google_next_call = time.monotonic() + GOOGLE_SEARCH_PAUSE
+
+def merge_results(*result_lists: list[str], limit: int | None = None) -> list[str]:
+    """
+    Merges result lists (e.g. successive result pages) in order, dropping URLs
+    that differ only by case, query, fragment or trailing slash.
+    """
+    seen = set()
+    merged = []
+    for results in result_lists:
+        for url in results:
+            key = canonical.canonical_page_url(url)
+            if key not in seen:
+                seen.add(key)
+                merged.append(url)
+    return merged[:limit]
+
+async def _google_search(query: str, num: int, cache: SearchCache | None, refresh: bool, tbs: str | None) -> list[str]:
+    key = _cache_query(query, tbs)
+    cached = await offload.run_db(cache.get, "google", key, 0, num, refresh) if cache is not None else None
+    if cached is not None:
+        return cached[0]
+    # googlesearch is synchronous, so it runs on the I/O pool instead of the event loop
+    results = await offload.run_io(google_search_fallback, query, num=num, tbs=tbs)
+    if cache is not None:
+        await offload.run_db(cache.put, "google", key, 0, num, results)
+    return results
 
-async def search_query(session: aiohttp.ClientSession, query: str, num: int = 20) -> list[str]:
+async def search_query(
+    session: aiohttp.ClientSession,
+    query: str,
+    num: int = 20,
+    cache: SearchCache | None = None,
+    refresh: bool = False,
+    tbs: str | None = None,
+) -> list[str]:
     """
-    Tries to search using SerpAPI first, then falls back to googlesearch-python.
+    Searches through SerpAPI, falling back to googlesearch-python only when
+    SerpAPI has no key or fails; results of the two engines are never combined.
+    A successful SerpAPI search is returned even when it has fewer than `num`
+    results (e.g. a narrow `tbs` window). Either engine's results are deduped
+    through merge_results.
+    Result pages go through `cache` when given; `refresh` bypasses its stored pages.
+    `tbs` restricts both engines to a date window (see recency_filter).
     """
     if SERPAPI_API_KEY:
         try:
-            return await serpapi_search(session, query, num=num)
+            return await serpapi_search(session, query, num=num, cache=cache, refresh=refresh, tbs=tbs)
         except Exception as e:
             print(f"[!] SerpAPI search failed: {e}. Falling back to googlesearch.")
-    # Note: google_search_fallback is synchronous.
-    # In a real async application, you would run this in an executor.
-    # For this tool, since it's a fallback, we accept the blocking call.
-    return google_search_fallback(query, num=num)
\ No newline at end of file
+    return merge_results(await _google_search(query, num, cache, refresh, tbs), limit=num)
+
+async def search_queries(
+    session: aiohttp.ClientSession,
+    queries: list[str],
+    num: int = 20,
+    concurrency: int = SEARCH_CONCURRENCY,
+    cache: SearchCache | None = None,
+    refresh: bool = False,
+    windows: dict[str, str] | None = None,
+    nums: dict[str, int] | None = None,
+) -> AsyncIterator[tuple[str, list[str] | None, Exception | None]]:
+    """
+    Runs `queries` with at most `concurrency` in flight and yields
+    (query, urls, error) as each one finishes; `urls` is None when it failed.
+    `cache` and `refresh` are passed on to search_query; `windows` maps
+    queries to their `tbs` date restriction and `nums` to their own result count.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(query: str):
+        async with semaphore:
+            try:
+                return query, await search_query(
+                    session, query, num=(nums or {}).get(query, num), cache=cache, refresh=refresh, tbs=(windows or {}).get(query)
+                ), None
+            except Exception as e:
+                return query, None, e
+
+    tasks = [asyncio.ensure_future(run(query)) for query in queries]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
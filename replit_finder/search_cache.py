@@ -0,0 +1,110 @@
+# replit_finder/search_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from .config import SEARCH_CACHE_TTL
+from .database import DB_PATH
+
+CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "search_cache.db"))
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    refreshed: int = 0
+    stores: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshed": self.refreshed,
+            "stores": self.stores,
+        }
+
+
+class SearchCache:
+    """
+    Persistent cache of search result pages, keyed by (engine, query, page,
+    num). A stored page younger than `ttl` is served instead of querying the
+    engine again, so repeated runs of the same dorks skip the paid search.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: int = SEARCH_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.stats = SearchCacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                engine TEXT,
+                query TEXT,
+                page INTEGER,
+                num INTEGER,
+                urls TEXT,
+                has_next INTEGER,
+                fetched_at REAL,
+                PRIMARY KEY (engine, query, page, num)
+            )
+        """)
+        # Expired pages are never served again; a refetch replaces them
+        self._conn.execute("DELETE FROM search_results WHERE fetched_at < ?", (time.time() - ttl,))
+        self._conn.commit()
+
+    def get(self, engine: str, query: str, page: int, num: int, refresh: bool = False) -> tuple[list[str], bool] | None:
+        """
+        Returns (urls, has_next) of a fresh stored page, or None (counted as a
+        miss). With `refresh` the stored page is ignored.
+        """
+        if refresh:
+            self.stats.refreshed += 1
+            return None
+        row = self._conn.execute(
+            "SELECT urls, has_next, fetched_at FROM search_results WHERE engine = ? AND query = ? AND page = ? AND num = ?",
+            (engine, query, page, num),
+        ).fetchone()
+        if row is None or time.time() - row[2] >= self.ttl:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(row[0]), bool(row[1])
+
+    def put(self, engine: str, query: str, page: int, num: int, urls: list[str], has_next: bool = False):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (engine, query, page, num, urls, has_next, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (engine, query, page, num, json.dumps(urls), int(has_next), time.time()),
+            )
+            self._conn.commit()
+            self.stats.stores += 1
+
+    def clear(self):
+        """Removes every stored page."""
+        with self._lock:
+            self._conn.execute("DELETE FROM search_results")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+_cache: SearchCache | None = None
+
+
+def get_cache() -> SearchCache:
+    """Returns the process-wide search cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = SearchCache()
+    return _cache
+
+
+def search_cache_stats() -> dict:
+    """Returns hit/miss counters of the search cache for this process."""
+    return get_cache().stats.to_dict()
@@ -0,0 +1,238 @@
+# replit_finder/sinks.py
+import abc
+import csv
+import heapq
+import json
+import os
+import tempfile
+from typing import Any, Callable, Iterator
+
+from . import detectors
+from .config import SORT_BUFFER_ROWS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Rows buffered per Parquet row group
+PARQUET_ROW_GROUP = 1000
+
+_LEADING_FIELDS = [
+    ("repo_url", "str"),
+    ("owner", "str"),
+    ("repo", "str"),
+    ("stars", "int"),
+    ("forks", "int"),
+    ("commit_count", "int"),
+    ("contributor_count", "int"),
+    ("license", "str"),
+    ("language", "str"),
+]
+_TRAILING_FIELDS = [
+    ("total_files", "int"),
+    ("total_lines", "int"),
+    ("trufflehog_findings", "int"),
+    ("bandit_findings", "int"),
+    ("pages_linking", "str"),
+    ("score", "int"),
+    ("category", "str"),
+]
+
+
+def result_schema() -> list[tuple[str, str]]:
+    """
+    Returns the fixed (name, type) column list of result files: repository
+    metadata, one column per registered detector, then analysis and score.
+    """
+    detector_fields = [
+        (d.name, "int" if d.measure == "size" else "bool") for d in detectors.DETECTORS.values()
+    ]
+    return _LEADING_FIELDS + detector_fields + _TRAILING_FIELDS
+
+
+def _project(row: dict, fields: list[str]) -> dict:
+    return {name: row.get(name) for name in fields}
+
+
+class ResultSink(abc.ABC):
+    """
+    Destination for enriched rows. Rows are appended as they are produced;
+    close() finalizes the file. Sinks are context managers.
+    """
+
+    def __init__(self, path: str, schema: list[tuple[str, str]] | None = None):
+        self.path = path
+        self.schema = schema or result_schema()
+        self.fields = [name for name, _ in self.schema]
+        self.rows = 0
+
+    def write(self, row: dict):
+        self._write(_project(row, self.fields))
+        self.rows += 1
+
+    @abc.abstractmethod
+    def _write(self, row: dict):
+        """Appends one row, already projected onto the schema's fields."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(ResultSink):
+    """CSV with a fixed header; every row is flushed so the file can be tailed."""
+
+    def __init__(self, path: str, schema: list[tuple[str, str]] | None = None):
+        super().__init__(path, schema)
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def _write(self, row: dict):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    """One JSON object per line, flushed per row."""
+
+    def __init__(self, path: str, schema: list[tuple[str, str]] | None = None):
+        super().__init__(path, schema)
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write(self, row: dict):
+        self._file.write(json.dumps(row, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """Parquet written in row groups of PARQUET_ROW_GROUP rows; requires pyarrow."""
+
+    _TYPES = {"str": "string", "int": "int64", "bool": "bool_"}
+
+    def __init__(self, path: str, schema: list[tuple[str, str]] | None = None):
+        if pa is None:
+            raise RuntimeError("Parquet output requires pyarrow. Please run 'pip install pyarrow'")
+        super().__init__(path, schema)
+        self._arrow_schema = pa.schema([(name, getattr(pa, self._TYPES[kind])()) for name, kind in self.schema])
+        self._writer = pq.ParquetWriter(path, self._arrow_schema)
+        self._buffer: list[dict] = []
+
+    def _write(self, row: dict):
+        self._buffer.append(row)
+        if len(self._buffer) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(pa.Table.from_pylist(self._buffer, schema=self._arrow_schema))
+            self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+SINKS: dict[str, type[ResultSink]] = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def format_of(path: str, fmt: str | None = None) -> str:
+    """Returns the output format: `fmt` if given, else the file extension, else csv."""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "csv").lower()
+    fmt = {"json": "jsonl", "ndjson": "jsonl", "pq": "parquet"}.get(fmt, fmt)
+    if fmt not in SINKS:
+        raise ValueError(f"Unknown output format: {fmt} (choose from {', '.join(SINKS)})")
+    return fmt
+
+
+def _sort_key(field: str) -> Callable[[dict], tuple]:
+    # Rows missing the field sort after every row that has it
+    def key(row: dict) -> tuple:
+        value = row.get(field)
+        return (value is not None, value if value is not None else 0)
+    return key
+
+
+def _read_run(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+class SortedSink(ResultSink):
+    """
+    Writes rows sorted by one field using an external merge sort: rows are
+    buffered up to `buffer_rows`, each full buffer is sorted and spilled to a
+    temporary run file, and close() merges the runs into the target sink.
+    The target is written to a temporary path and renamed into place, so a
+    reader never sees a half-sorted file.
+    """
+
+    def __init__(self, path: str, fmt: str, sort_by: str, reverse: bool = True, buffer_rows: int = SORT_BUFFER_ROWS):
+        super().__init__(path)
+        self.fmt = fmt
+        self.key = _sort_key(sort_by)
+        self.reverse = reverse
+        self.buffer_rows = max(1, buffer_rows)
+        self._buffer: list[dict] = []
+        self._runs: list[str] = []
+        self._spill_dir = tempfile.mkdtemp(prefix="replit_finder_sort_")
+
+    def _write(self, row: dict):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.buffer_rows:
+            self._spill()
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        self._buffer.sort(key=self.key, reverse=self.reverse)
+        run_path = os.path.join(self._spill_dir, f"run{len(self._runs):05d}.jsonl")
+        with open(run_path, "w", encoding="utf-8") as f:
+            for row in self._buffer:
+                f.write(json.dumps(row, default=str) + "\n")
+        self._runs.append(run_path)
+        self._buffer = []
+
+    def close(self):
+        self._buffer.sort(key=self.key, reverse=self.reverse)
+        sources: list[Any] = [_read_run(run) for run in self._runs] + [iter(self._buffer)]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with SINKS[self.fmt](tmp_path, self.schema) as sink:
+                for row in heapq.merge(*sources, key=self.key, reverse=self.reverse):
+                    sink.write(row)
+            os.replace(tmp_path, self.path)
+        finally:
+            self._buffer = []
+            for run in self._runs:
+                os.remove(run)
+            os.rmdir(self._spill_dir)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def open_sink(path: str, fmt: str | None = None, sort_by: str | None = None, reverse: bool = True) -> ResultSink:
+    """
+    Opens a result sink for `path`. Without `sort_by` rows are appended as
+    they arrive; with it the file is written sorted when the sink is closed.
+    """
+    fmt = format_of(path, fmt)
+    if sort_by:
+        return SortedSink(path, fmt, sort_by, reverse)
+    return SINKS[fmt](path)
@@ -0,0 +1,196 @@
+# replit_finder/writer.py
+import atexit
+import concurrent.futures
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from . import database, offload
+from .config import WRITE_BATCH_SIZE, WRITE_FLUSH_MS
+
+# Attempts for one batch before its rows are reported as lost
+WRITE_ATTEMPTS = 3
+# Seconds flush_async waits for the queue to drain
+FLUSH_TIMEOUT = 120.0
+_TICK = object()
+
+
+class WriteFailed(Exception):
+    """A queued row could not be written after WRITE_ATTEMPTS attempts."""
+
+
+@dataclass
+class WriterStats:
+    queued: int = 0
+    written: int = 0
+    failed: int = 0
+    batches: int = 0
+    total_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+    last_flush_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 2) if self.batches else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+class RepositoryWriter:
+    """
+    Write-behind writer for repository upserts. `put` only queues the row; a
+    dedicated thread collects rows into batches of up to `batch_size` and
+    writes a batch once it is full or its oldest row has waited
+    `flush_interval` seconds, one executemany transaction per batch (see
+    database.insert_repositories). `flush` blocks until everything queued
+    before it is written. Rows still queued are visible through `contains`,
+    and the future `put` returns resolves once the row is stored.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, flush_interval: float = WRITE_FLUSH_MS / 1000):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.stats = WriterStats()
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="repository-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, repo_data: Dict[str, Any]) -> concurrent.futures.Future:
+        """Queues a row; the returned future fails with WriteFailed if the row is dropped."""
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._pending[repo_data["repo_url"]] = repo_data
+            self.stats.queued += 1
+        self._queue.put((repo_data, future))
+        return future
+
+    def contains(self, repo_url: str) -> bool:
+        """True if a row for `repo_url` is queued but not yet written."""
+        with self._lock:
+            return repo_url in self._pending
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until every row queued so far is written; returns False on timeout."""
+        if not self._thread.is_alive():
+            return not self._pending
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Writes what is queued and stops the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        batch = []
+        deadline = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()) if batch else None)
+            except queue.Empty:
+                item = _TICK
+            if isinstance(item, tuple):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._write(batch)
+                batch = []
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                database.close_connection()
+                return
+
+    def _write(self, batch: list):
+        started = time.perf_counter()
+        # Futures cancelled by their waiter are skipped; the rest can no longer be cancelled
+        futures = [future for _, future in batch if future.set_running_or_notify_cancel()]
+        rows = [repo_data for repo_data, _ in batch]
+        error = None
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                database.insert_repositories(rows)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt == WRITE_ATTEMPTS - 1:
+                    print(f"[!] Failed to write {len(rows)} repositories: {e}")
+                else:
+                    time.sleep(0.1 * 2 ** attempt)
+        written = error is None
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            for repo_data in rows:
+                # A newer row for the same repo may have been queued meanwhile
+                if self._pending.get(repo_data["repo_url"]) is repo_data:
+                    del self._pending[repo_data["repo_url"]]
+            if written:
+                self.stats.written += len(batch)
+            else:
+                self.stats.failed += len(batch)
+            self.stats.batches += 1
+            self.stats.total_flush_ms += elapsed
+            self.stats.max_flush_ms = max(self.stats.max_flush_ms, elapsed)
+            self.stats.last_flush_ms = elapsed
+        for future in futures:
+            if written:
+                future.set_result(None)
+            else:
+                future.set_exception(WriteFailed(str(error)))
+
+
+_writer: RepositoryWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> RepositoryWriter:
+    """Returns the process-wide repository writer, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = RepositoryWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+async def flush_async(failed_before: int = 0, timeout: float = FLUSH_TIMEOUT) -> int:
+    """
+    Flushes the process-wide writer from async code on the I/O pool, so the
+    event loop keeps running. Reports and returns the rows not written: those
+    failed since the writer's `failed` count was `failed_before`, plus any still
+    queued after `timeout` (close() at exit still writes those).
+    """
+    writer = get_writer()
+    done = await offload.run_io(writer.flush, timeout)
+    queued = 0 if done else writer.depth()
+    if queued:
+        print(f"[!] {queued} repository rows still queued after {timeout:.0f}s; they are written at exit")
+    failed = writer.stats.failed - failed_before
+    if failed:
+        print(f"[!] {failed} repository rows could not be written to the database")
+    return failed + queued
+
+
+def writer_stats() -> dict:
+    """Returns the writer's counters, flush latencies and current queue depth."""
+    writer = get_writer()
+    return {**writer.stats.to_dict(), "queue_depth": writer.depth()}
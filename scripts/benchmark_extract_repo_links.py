@@ -0,0 +1,28 @@
+"""
+Times scraper.extract_repo_links against the legacy two-regex + BeautifulSoup
+extractor on generated Replit-like pages. Run from the repository root:
+    python scripts/benchmark_extract_repo_links.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replit_finder.scraper import extract_repo_links
+from test_extract_repo_links import build_page, legacy_extract_repo_links, normalize
+
+
+def benchmark():
+    for links, filler_kb in ((20, 64), (200, 512), (2000, 4096)):
+        html = build_page(links, filler_kb)
+        for name, fn in (("legacy", legacy_extract_repo_links), ("single-pass", extract_repo_links)):
+            start = time.perf_counter()
+            found = fn(html)
+            elapsed = time.perf_counter() - start
+            print(f"{len(html) / 1024:8.0f} KB  {name:12s} {elapsed * 1000:9.1f} ms  {len(normalize(found))} links")
+
+
+if __name__ == "__main__":
+    benchmark()
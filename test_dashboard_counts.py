@@ -0,0 +1,100 @@
+"""
+Dashboard aggregates: after any mix of inserts, upserts, updates and deletes,
+the trigger-maintained dashboard_counts must equal a full recount of the
+repositories table, and rebuild_dashboard_counts must restore them.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from replit_finder import database
+
+
+def recount() -> dict:
+    """The dashboard stats computed the way get_dashboard_stats used to: by scanning repositories."""
+    with database.get_connection() as conn:
+        cursor = conn.cursor()
+        total = cursor.execute("SELECT COUNT(*) FROM repositories").fetchone()[0]
+        production = cursor.execute("SELECT COUNT(*) FROM repositories WHERE category = 'production'").fetchone()[0]
+        security = cursor.execute(
+            "SELECT COUNT(*) FROM repositories WHERE trufflehog_findings > 0 OR bandit_findings > 0"
+        ).fetchone()[0]
+        languages = dict(cursor.execute(
+            "SELECT language, COUNT(*) FROM repositories WHERE language IS NOT NULL GROUP BY language"
+        ).fetchall())
+        timeline = []
+        today = datetime.now().date()
+        for i in range(29, -1, -1):
+            day = today - timedelta(days=i)
+            count = cursor.execute(
+                "SELECT COUNT(*) FROM repositories WHERE last_processed >= ? AND last_processed < ?",
+                (day, day + timedelta(days=1)),
+            ).fetchone()[0]
+            timeline.append({"date": day.strftime("%Y-%m-%d"), "count": count})
+    return {"total": total, "production": production, "security": security, "languages": languages, "timeline": timeline}
+
+
+def assert_matches_recount():
+    expected = recount()
+    stats = database.get_dashboard_stats()
+    assert stats["totalRepositories"] == expected["total"]
+    assert stats["productionReady"] == expected["production"]
+    assert stats["nonProduction"] == expected["total"] - expected["production"]
+    assert stats["securityIssues"] == expected["security"]
+    assert stats["analysisTimeline"] == expected["timeline"]
+    # The dashboard shows the ten largest languages
+    assert {item["name"]: item["value"] for item in stats["languageBreakdown"]}.items() <= expected["languages"].items()
+    assert len(stats["languageBreakdown"]) == min(10, len(expected["languages"]))
+
+
+def random_rows(rng, count):
+    now = datetime.now()
+    return [
+        {
+            "repo_url": f"https://github.com/o/r{rng.randrange(60)}",
+            "owner": "o",
+            "repo": "r",
+            "language": rng.choice([None, "Python", "Go", "Rust", "TypeScript"]),
+            "category": rng.choice(["production", "non-production"]),
+            "trufflehog_findings": rng.choice([None, 0, 2]),
+            "bandit_findings": rng.choice([0, 0, 1]),
+            "last_processed": str(now - timedelta(days=rng.randrange(40), hours=rng.randrange(24))),
+        }
+        for _ in range(count)
+    ]
+
+
+def test_counts_follow_upserts_updates_and_deletes(db):
+    rng = random.Random(11)
+    assert_matches_recount()
+    for _ in range(5):
+        # Repo URLs repeat, so most of these are upserts of existing rows
+        database.insert_repositories(random_rows(rng, 40))
+        assert_matches_recount()
+    with database.get_connection() as conn:
+        conn.execute("UPDATE repositories SET category = 'production', language = 'Go' WHERE repo_url LIKE '%r1_'")
+    assert_matches_recount()
+    with database.get_connection() as conn:
+        conn.execute("DELETE FROM repositories WHERE repo_url LIKE '%r2%'")
+    assert_matches_recount()
+
+
+def test_rebuild_restores_diverged_counts(db):
+    database.insert_repositories(random_rows(random.Random(3), 50))
+    with database.get_connection() as conn:
+        conn.execute("UPDATE dashboard_counts SET count = count + 7")
+        conn.execute("DELETE FROM dashboard_counts WHERE metric = 'language'")
+    assert database.rebuild_dashboard_counts() == recount()["total"]
+    assert_matches_recount()
+
+
+def test_existing_rows_are_counted_when_the_table_is_created(db):
+    database.insert_repositories(random_rows(random.Random(5), 30))
+    with database.get_connection() as conn:
+        conn.execute("DROP TABLE dashboard_counts")
+        for trigger in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER dashboard_counts_{trigger}")
+    database.init_db()
+    assert_matches_recount()
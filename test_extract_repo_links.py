@@ -0,0 +1,99 @@
+"""
+Correctness corpus for scraper.extract_repo_links, checked against the legacy
+extractor; scripts/benchmark_extract_repo_links.py times the two.
+"""
+
+import re
+import warnings
+
+from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
+
+from replit_finder.scraper import extract_repo_links
+
+LEGACY_GITHUB = re.compile(r"https?://github\.com/([A-Za-z0-9_.-]+)/([A-Za-z0-9_.-]+)(?:/|$)")
+LEGACY_GITLAB = re.compile(r"https?://gitlab\.com/([A-Za-z0-9_.-]+)/([A-Za-z0-9_.-]+)(?:/|$)")
+
+
+def legacy_extract_repo_links(html: str) -> set[str]:
+    """The previous two-regex + BeautifulSoup extractor, kept as the reference."""
+    found = set()
+    for match in LEGACY_GITHUB.finditer(html):
+        found.add(f"https://github.com/{match.group(1)}/{match.group(2)}")
+    for match in LEGACY_GITLAB.finditer(html):
+        found.add(f"https://gitlab.com/{match.group(1)}/{match.group(2)}")
+    with warnings.catch_warnings():
+        # Corpus entries that are bare URLs trip this bs4 heuristic
+        warnings.simplefilter("ignore", MarkupResemblesLocatorWarning)
+        soup = BeautifulSoup(html, "html.parser")
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if href.startswith("https://github.com/"):
+            match = LEGACY_GITHUB.match(href)
+            if match:
+                found.add(match.group(0))
+    return found
+
+
+def normalize(links: set[str]) -> set[str]:
+    # The legacy anchor pass kept a trailing slash on links like /owner/repo/issues
+    return {link.rstrip("/") for link in links}
+
+
+# Pages both extractors must agree on
+SHARED_CORPUS = [
+    '<a href="https://github.com/octo/hello-world">repo</a>',
+    '<a href="https://github.com/octo/hello-world/">repo</a>',
+    '<a href="https://github.com/octo/hello.world/tree/main/src">tree</a>',
+    '<a href="http://github.com/Octo-Org/My_Repo/issues/1">issue</a>',
+    '<p>https://gitlab.com/group/project/-/blob/main/README.md</p>',
+    '<a href="https://github.com/a/b/">x</a><a href="https://gitlab.com/c/d/">y</a>',
+    'plain text https://github.com/a/b/pulls and more',
+    "https://github.com/last/link",
+    '<a href="https://github.com/octo">profile only</a>',
+    '<a href="https://example.com/github.com/x/y">not github</a>',
+    '<a href="/relative/path">nothing</a>',
+    "",
+]
+
+# Forms only the new extractor handles, with the links it must find
+EXTENDED_CORPUS = [
+    ('<a href="//github.com/octo/proto-relative">x</a>', {"https://github.com/octo/proto-relative"}),
+    ('<a href="https:&#x2F;&#x2F;github.com&#x2F;octo&#x2F;encoded">x</a>', {"https://github.com/octo/encoded"}),
+    ('<a href="https:&#47;&#47;github&#46;com&#47;octo&#47;decimal">x</a>', {"https://github.com/octo/decimal"}),
+    ('<script>{"repo":"https:\\/\\/github.com\\/octo\\/json-escaped"}</script>', {"https://github.com/octo/json-escaped"}),
+    ('<script>const u = "https://gitlab.com/grp/in-script";</script>', {"https://gitlab.com/grp/in-script"}),
+    ("Source: github.com/octo/scheme-less.", {"https://github.com/octo/scheme-less"}),
+    ('<a href="https://www.github.com/octo/www">x</a>', {"https://github.com/octo/www"}),
+    ('<a href="https://GitHub.com/octo/mixed-case">x</a>', {"https://github.com/octo/mixed-case"}),
+    ('<a href="https://api.github.com/repos/octo/x">api</a>', set()),
+    ('<a href="https://notgithub.com/octo/x">other</a>', set()),
+    ('<a href="https://gist.github.com/octo/abc123">gist</a>', set()),
+]
+
+
+def test_shared_corpus_matches_legacy():
+    for html in SHARED_CORPUS:
+        assert extract_repo_links(html) == normalize(legacy_extract_repo_links(html)), html
+
+
+def test_extended_forms():
+    for html, expected in EXTENDED_CORPUS:
+        assert extract_repo_links(html) == expected, html
+
+
+def test_generated_page_is_superset_of_legacy():
+    html = build_page(200)
+    assert normalize(legacy_extract_repo_links(html)) <= extract_repo_links(html)
+
+
+def build_page(links: int, filler_kb: int = 0) -> str:
+    """A Replit-like page: an inline bundle, `filler_kb` of markup, and `links` repo links in anchors and text."""
+    card = '<div class="card"><span class="title">Item</span><a href="/item">open it</a></div>'
+    parts = ["<html><head><script>", "var a=1;" * (filler_kb * 32), "</script></head><body>"]
+    parts.append(card * (filler_kb * 768 // len(card)))
+    for i in range(links):
+        parts.append(f'<div class="card"><a href="https://github.com/user{i}/app-{i}/">repo</a>')
+        parts.append(f"<p>Mirror: https://gitlab.com/group{i}/proj{i}/-/tree/main</p></div>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
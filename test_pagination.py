@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination of the repositories table: walking every cursor
+page must return exactly the rows of the numbered pages, in the same order,
+including rows whose sort value is NULL.
+"""
+
+import random
+
+import pytest
+
+from replit_finder import database
+
+
+@pytest.fixture
+def db(db):
+    rng = random.Random(7)
+    database.insert_repositories([
+        {
+            "repo_url": f"https://github.com/owner{i % 5}/repo{i}",
+            "owner": f"owner{i % 5}",
+            "repo": f"repo{i}",
+            # Few distinct values, so ties and NULLs are common
+            "stars": rng.choice([None, 0, 3, 3, 10]),
+            "score": rng.choice([None, 5, 12]),
+            "language": rng.choice(["Python", "TypeScript"]),
+        }
+        for i in range(57)
+    ])
+
+
+def walk_pages(per_page, sort, query=""):
+    rows, page = [], 1
+    while True:
+        items, total = database.get_repositories_paginated(page, per_page, sort, query)
+        rows += [item["repo_url"] for item in items]
+        if page * per_page >= total:
+            return rows
+        page += 1
+
+
+def walk_cursor(per_page, sort, query=""):
+    rows, cursor = [], None
+    while True:
+        items, cursor = database.get_repositories_after(cursor, per_page, sort, query)
+        rows += [item["repo_url"] for item in items]
+        if cursor is None:
+            return rows
+
+
+@pytest.mark.parametrize("sort", ["-score", "score", "-stars", "stars", "-last_processed"])
+@pytest.mark.parametrize("per_page", [1, 4, 20, 100])
+def test_cursor_pages_match_numbered_pages(db, sort, per_page):
+    expected = walk_pages(per_page, sort)
+    assert len(expected) == 57
+    assert walk_cursor(per_page, sort) == expected
+
+
+def test_cursor_pages_with_search(db):
+    expected = walk_pages(6, "-stars", "python")
+    assert expected
+    assert walk_cursor(6, "-stars", "python") == expected
+
+
+def test_last_page_has_no_cursor(db):
+    items, cursor = database.get_repositories_after(None, 100, "-score")
+    assert len(items) == 57 and cursor is None
+
+
+def test_rows_written_between_pages_do_not_shift_a_cursor(db):
+    first, cursor = database.get_repositories_after(None, 10, "-score")
+    database.insert_repositories([{"repo_url": "https://github.com/aaa/top", "owner": "aaa", "repo": "top", "score": 99}])
+    second, _ = database.get_repositories_after(cursor, 10, "-score")
+    before = walk_pages(57, "-score")
+    assert [item["repo_url"] for item in first + second] == [url for url in before if url != "https://github.com/aaa/top"][:20]
+
+
+def test_cursor_from_another_sort_is_rejected(db):
+    _, cursor = database.get_repositories_after(None, 5, "-score")
+    with pytest.raises(ValueError):
+        database.get_repositories_after(cursor, 5, "stars")
+    with pytest.raises(ValueError):
+        database.get_repositories_after("not a cursor", 5, "-score")
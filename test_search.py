@@ -0,0 +1,67 @@
+"""
+Repository search: the FTS index must find everything the substring (LIKE)
+search over repo, owner, license and language used to find, including
+substrings inside words and punctuated queries such as URLs.
+"""
+
+import pytest
+
+from replit_finder import database
+
+
+REPOS = [
+    ("facebook", "react", "JavaScript", "MIT"),
+    ("python", "cpython", "Python", "PSF-2.0"),
+    ("golang", "go", "Go", "BSD-3-Clause"),
+    ("pallets", "flask", "Python", "BSD-3-Clause"),
+    ("actions", "checkout", "TypeScript", "MIT"),
+    ("rust-lang", "rust", "Rust", "Apache-2.0"),
+]
+
+
+@pytest.fixture
+def db(db):
+    database.insert_repositories([
+        {
+            "repo_url": f"https://github.com/{owner}/{repo}",
+            "owner": owner,
+            "repo": repo,
+            "language": language,
+            "license": license,
+            "description": f"{repo} by {owner}",
+        }
+        for owner, repo, language, license in REPOS
+    ])
+
+
+def search(query):
+    items, _ = database.get_repositories_paginated(1, 100, "-score", query)
+    return {item["repo_url"] for item in items}
+
+
+def like_search(query):
+    """What the search returned before the FTS index: a substring match on four columns."""
+    term = f"%{query}%"
+    with database.get_connection() as conn:
+        rows = conn.execute(
+            "SELECT repo_url FROM repositories WHERE repo LIKE ? OR owner LIKE ? OR license LIKE ? OR language LIKE ?",
+            [term] * 4,
+        ).fetchall()
+    return {row[0] for row in rows}
+
+
+@pytest.mark.parametrize("query", ["act", "py", "ython", "REACT", "go", "Python", "mit", "bsd-3", "rust-lang", "lask", "xyz"])
+def test_search_finds_every_substring_match(db, query):
+    assert like_search(query) <= search(query)
+
+
+def test_search_by_repository_url(db):
+    assert search("https://github.com/golang/go") == {"https://github.com/golang/go"}
+    assert search("pallets/flask") == {"https://github.com/pallets/flask"}
+
+
+def test_word_queries_use_the_index(db):
+    where, params = database._search_filter(database.get_connection().cursor(), "flask pallets")
+    assert "MATCH" in where and params == ['"flask"* "pallets"*']
+    where, _ = database._search_filter(database.get_connection().cursor(), "act")
+    assert "LIKE" in where
@@ -0,0 +1,99 @@
+"""
+Write-behind repository writer: queued rows are visible until written, flush()
+waits for everything queued before it, the newest row for a repo wins, and
+rows of a batch that keeps failing are counted as failed, fail their futures
+and are reported by flush_async.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from replit_finder import database, offload, writer
+
+
+def row(i, score=1):
+    return {"repo_url": f"https://github.com/o/r{i}", "owner": "o", "repo": f"r{i}", "score": score}
+
+
+def test_flush_writes_every_queued_row(db):
+    w = writer.RepositoryWriter(batch_size=7, flush_interval=60)
+    try:
+        futures = [w.put(row(i)) for i in range(50)]
+        assert w.flush(timeout=10)
+        assert all(future.result(timeout=0) is None for future in futures)
+        assert database.count_repositories() == 50
+        assert w.depth() == 0
+        assert w.stats.written == 50 and w.stats.failed == 0
+    finally:
+        w.close()
+
+
+def test_queued_rows_are_visible_until_written(db, monkeypatch):
+    release = threading.Event()
+    insert = database.insert_repositories
+
+    def slow_insert(rows):
+        release.wait(10)
+        insert(rows)
+
+    monkeypatch.setattr(database, "insert_repositories", slow_insert)
+    w = writer.RepositoryWriter(batch_size=1)
+    try:
+        w.put(row(1))
+        assert w.contains("https://github.com/o/r1")
+        release.set()
+        assert w.flush(timeout=10)
+        assert not w.contains("https://github.com/o/r1")
+        assert database.is_repo_processed("https://github.com/o/r1")
+    finally:
+        release.set()
+        w.close()
+
+
+def test_newest_row_for_a_repo_wins(db):
+    w = writer.RepositoryWriter(batch_size=100, flush_interval=60)
+    try:
+        w.put(row(1, score=3))
+        w.put(row(1, score=8))
+        assert w.flush(timeout=10)
+    finally:
+        w.close()
+    items, _ = database.get_repositories_paginated(1, 10)
+    assert [(item["repo_url"], item["score"]) for item in items] == [("https://github.com/o/r1", 8)]
+
+
+def test_failing_batch_is_counted_and_dropped(db, monkeypatch):
+    def broken_insert(rows):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(database, "insert_repositories", broken_insert)
+    monkeypatch.setattr(writer.time, "sleep", lambda seconds: None)
+    w = writer.RepositoryWriter(batch_size=2)
+    try:
+        futures = [w.put(row(1)), w.put(row(2))]
+        assert w.flush(timeout=10)
+        assert w.stats.failed == 2 and w.stats.written == 0
+        assert w.depth() == 0
+        for future in futures:
+            with pytest.raises(writer.WriteFailed, match="disk full"):
+                future.result(timeout=0)
+    finally:
+        w.close()
+
+
+def test_flush_async_reports_rows_not_written(db, monkeypatch):
+    def broken_insert(rows):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(database, "insert_repositories", broken_insert)
+    monkeypatch.setattr(writer.time, "sleep", lambda seconds: None)
+    w = writer.RepositoryWriter(batch_size=1)
+    monkeypatch.setattr(writer, "_writer", w)
+    try:
+        w.put(row(1))
+        assert asyncio.run(writer.flush_async(failed_before=0, timeout=10)) == 1
+    finally:
+        w.close()
+        offload.shutdown()